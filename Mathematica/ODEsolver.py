@@ -9,7 +9,7 @@ from rules import Var, Const, Add, Mul, Pow, Exp, Log, Sin, Cos, Sub, Div, Neg,
 from integration import integrate
 from ODEclassifier import classify_first_order
 from utils import is_independent_of
-from logger import reset_log, log_step, get_step_counter, LOG_FILE
+from logger import reset_log, log_step, get_step_counter, enable_log, LOG_FILE
 from simplification import rewrite, simplification_rules, evaluate_constants
 
 # ============================================================
@@ -22,7 +22,7 @@ class DyDx(Expr):
         self.var = Var(var)
         self.wrt = Var(wrt)
     def children(self): return [self.var, self.wrt]
-    def __repr__(self): return f"d{self.var}/d{self.wrt}"
+    def _build_repr(self): return f"d{self.var}/d{self.wrt}"
     def __eq__(self, other):
         return isinstance(other, DyDx) and repr(self) == repr(other)
 
@@ -63,8 +63,8 @@ def _children2(node):
     if hasattr(node, "children"):
         try:
             kids = node.children()
-            if isinstance(kids, list):
-                return kids
+            if isinstance(kids, (list, tuple)):
+                return list(kids)
         except Exception:
             pass
     pair = []
@@ -77,18 +77,19 @@ def _children2(node):
         return [node.arg]
     return []
 
+# Nodes are interned, so "prints as 1" is exactly "is the Const(1) node".
 def _is_one(e) -> bool:
-    return repr(e) == repr(Const(1))
+    return e is Const(1)
 
 def _is_two(e) -> bool:
-    return repr(e) == repr(Const(2))
+    return e is Const(2)
 
 # ============================================================
 # normalization
 # ============================================================
 
 def normalize_ode(ode_expr: Expr, dy_dx_marker: DyDx, x_var: str) -> tuple[Expr, Expr, Expr]:
-    log_step(f"Normalizing ODE: solving for {dy_dx_marker}")
+    log_step("Normalizing ODE: solving for %s", dy_dx_marker)
     flat_terms = flatten_ode_terms(ode_expr)
     n_yprime = None
     m_terms = []
@@ -113,8 +114,8 @@ def normalize_ode(ode_expr: Expr, dy_dx_marker: DyDx, x_var: str) -> tuple[Expr,
     N = rewrite(N, simplification_rules()); N = evaluate_constants(N)
     f_xy = Div(Neg(M), N)
     f_xy = rewrite(f_xy, simplification_rules()); f_xy = evaluate_constants(f_xy)
-    log_step(f"Decomposition: M={M}, N={N}")
-    log_step(f"Normalized RHS f(x,y): {f_xy}")
+    log_step("Decomposition: M=%s, N=%s", M, N)
+    log_step("Normalized RHS f(x,y): %s", f_xy)
     return M, N, f_xy
 
 # ============================================================
@@ -145,9 +146,9 @@ def solve_separable_gxh(f_xy: Expr, x_var="x", y_var="y") -> str:
     one_over_h = rewrite(one_over_h, simplification_rules()); one_over_h = evaluate_constants(one_over_h)
     lhs = integrate(one_over_h, y_var, reset=True)
     rhs = integrate(g_x, x_var, reset=True)
-    log_step(f"g(x)={g_x}, h(y)={h_y}")
-    log_step(f"LHS ∫(1/h)dy={lhs}")
-    log_step(f"RHS ∫g(x)dx={rhs}")
+    log_step("g(x)=%s, h(y)=%s", g_x, h_y)
+    log_step("LHS ∫(1/h)dy=%s", lhs)
+    log_step("RHS ∫g(x)dx=%s", rhs)
     A = Var("A")
     if isinstance(lhs, Log) and (lhs.arg == y or lhs.arg == Abs(y)):
         log_step("Detected log|y| ⇒ explicit exponential solution")
@@ -180,10 +181,10 @@ def solve_linear_first_order(f_xy: Expr, x_var="x", y_var="y") -> str:
     P_x = Neg(neg_P_x)
     for _ in range(3):
         P_x = rewrite(P_x, simplification_rules()); P_x = evaluate_constants(P_x)
-    log_step(f"Decomposition: P(x)={P_x}, Q(x)={Q_x}")
+    log_step("Decomposition: P(x)=%s, Q(x)=%s", P_x, Q_x)
     I_P = integrate(P_x, x_var, reset=True)
     mu = Exp(I_P); mu = rewrite(mu, simplification_rules()); mu = evaluate_constants(mu)
-    log_step(f"Integrating Factor μ(x)={mu}")
+    log_step("Integrating Factor μ(x)=%s", mu)
     muQ = Mul(mu, Q_x); muQ = rewrite(muQ, simplification_rules()); muQ = evaluate_constants(muQ)
     I_muQ = integrate(muQ, x_var, reset=True)
     inv_mu = Div(Const(1), mu)
@@ -211,7 +212,7 @@ def solve_homogeneous(f_xy: Expr, x_var="x", y_var="y") -> str:
     f_vx = rewrite(f_vx, simplification_rules()); f_vx = evaluate_constants(f_vx)
     rhs = Sub(f_vx, v); rhs = rewrite(rhs, simplification_rules()); rhs = evaluate_constants(rhs)
     separable_rhs = Div(rhs, x); separable_rhs = rewrite(separable_rhs, simplification_rules()); separable_rhs = evaluate_constants(separable_rhs)
-    log_step(f"Reduced to separable form: dv/dx = {separable_rhs}")
+    log_step("Reduced to separable form: dv/dx = %s", separable_rhs)
     lhs_int = integrate(Div(Const(1), Sub(f_vx, v)), "v", reset=True)
     rhs_int = integrate(Div(Const(1), x), "x", reset=True)
     return f"Implicit Solution: {lhs_int} = ({rhs_int}+C)"
@@ -296,7 +297,7 @@ def _try_extract_riccati(f_xy: Expr, x: Var, y: Var):
     c = rewrite(evaluate_constants(c), simplification_rules())
 
     # STRICT: Riccati requires quadratic term present
-    if repr(c) == repr(Const(0)):
+    if c is Const(0):
         return (False, None, None, None)
 
     return (True, a, b, c)
@@ -307,7 +308,7 @@ def solve_riccati_from_coeffs(a, b, c, x_var="x") -> str:
     y = -u'/(c u)  ⇒  u'' + b u' + a c u = 0
     """
     reduced = f"u'' + ({b})u' + ({a})({c})u = 0"
-    log_step(f"Reduced 2nd-order linear ODE: {reduced}")
+    log_step("Reduced 2nd-order linear ODE: %s", reduced)
     return f"Solution via Riccati substitution ⇒ {reduced}  (solve for u(x), then y = -u'/({c}u))"
 
 # ============================================================
@@ -317,22 +318,22 @@ def solve_riccati_from_coeffs(a, b, c, x_var="x") -> str:
 def ODEsolver(ode_expr: Expr, x_var="x", y_var="y") -> str:
     dy = DyDx(y_var, x_var)
     reset_log()
-    log_step(f"Starting ODE solver for ODE: {ode_expr}=0")
+    log_step("Starting ODE solver for ODE: %s=0", ode_expr)
     M, N, f_xy = normalize_ode(ode_expr, dy, x_var)
     if M is None:
         return "Error: normalization failed"
-    log_step(f"Normalized explicit form: dy/dx={f_xy}")
+    log_step("Normalized explicit form: dy/dx=%s", f_xy)
 
     # EARLY and PRECISE Riccati recognition (c(x) must be nonzero)
     x = Var(x_var); y = Var(y_var)
     is_ric, a, b, c = _try_extract_riccati(f_xy, x, y)
     if is_ric:
-        log_step(f"Riccati detected with a(x)={a}, b(x)={b}, c(x)={c}")
+        log_step("Riccati detected with a(x)=%s, b(x)=%s, c(x)=%s", a, b, c)
         return solve_riccati_from_coeffs(a, b, c, x_var)
 
     # Structural classification for other types
     t = classify_first_order(f_xy, x_var, y_var)
-    log_step(f"ODE classified as: {t}")
+    log_step("ODE classified as: %s", t)
 
     if t == "Separable-f(x)":
         return f"Solution y(x) = {solve_separable_fx(f_xy, x_var)}"
@@ -355,6 +356,7 @@ def ODEsolver(ode_expr: Expr, x_var="x", y_var="y") -> str:
 
 if __name__ == "__main__":
     print("\n=== ODE Solver and Classifier Test Harness ===\n")
+    enable_log()
     x = Var("x"); y = Var("y"); dy = DyDx("y", "x")
     tests = [
         ("ODE 1: Separable f(x) (y' + M(x)=0)",
@@ -1,17 +1,48 @@
 # ============================================================
 # Differentiation
 # ============================================================
+from functools import lru_cache
+from typing import Dict, Tuple
 from rules import *
 from simplification import *
 
+# ------------------------------------------------------------
+# Derivative Cache
+# ------------------------------------------------------------
+# The integration strategies differentiate the same candidate sub-expressions
+# over and over (every u-candidate, both orientations of a product, every
+# recursive IBP level). Results are cached per (node, variable). Nodes are
+# interned, so identity is the key; the node is stored alongside its
+# derivative to keep its id from being reused. integrate() clears the cache
+# at the start of each top-level run, and it is also cleared once it holds
+# _DIFF_CACHE_LIMIT entries, so runs that only differentiate neither grow it
+# without bound nor keep every node they ever saw alive.
+
+_DIFF_CACHE: Dict[Tuple[int, str], Tuple[Expr, Expr]] = {}
+_DIFF_CACHE_LIMIT = 100_000
+
+def clear_diff_cache():
+    """Drop cached derivatives."""
+    _DIFF_CACHE.clear()
+
 def differentiate(expr: Expr, var: str) -> Expr:
-    v = Var(var)
-    
+    key = (id(expr), var)
+    hit = _DIFF_CACHE.get(key)
+    if hit is not None:
+        return hit[1]
+    result = _differentiate(expr, var)
+    if len(_DIFF_CACHE) >= _DIFF_CACHE_LIMIT: _DIFF_CACHE.clear()
+    _DIFF_CACHE[key] = (expr, result)
+    return result
+
+@lru_cache(maxsize=8)
+def diff_rules(var: str) -> Tuple[Rule, ...]:
+    """Differentiation rules with respect to var (built once per variable)."""
     # Placeholder for |u| using Pow for square root of u^2
     def Abs(u):
         return Pow(Pow(u, Const(2)), Div(Const(1), Const(2)))
 
-    diff_rules = [
+    return make_rules((
         # constants and variables
         (Differentiate(Const(PatternVar("c")), Var(PatternVar("vv"))), Const(0)),
         (Differentiate(Var(var), Var(var)), Const(1)),
@@ -113,12 +144,43 @@ def differentiate(expr: Expr, var: str) -> Expr:
         # ----- Unary negation -----
         (Differentiate(Neg(PatternVar("u")), Var(var)),
         Neg(Differentiate(PatternVar("u"), Var(var)))),
-    ]
-    
+    ))
+
+def _expand(expr: Expr, drules: Tuple[Rule, ...]) -> Expr:
+    """
+    Expand every Differentiate node in expr by recursing into the result of
+    each rule, instead of rewrite() re-walking the whole tree once per rule
+    application. The rules, their order and the leftmost-outermost order of
+    application are the same, and each result is folded before it is
+    expanded further, as the rewrite loop folds the tree after every pass.
+    A Differentiate no rule matches is left for the rewrite loop.
+    """
+    if not expr.sig & Differentiate._type_bit:
+        return expr
+    if type(expr) is Differentiate:
+        new = rewrite_at(expr, drules)
+        return expr if new is None else _expand(evaluate_constants(new), drules)
+    children = expr.children()
+    expanded = [_expand(child, drules) for child in children]
+    if all(new is old for new, old in zip(expanded, children)):
+        return expr
+    return type(expr)(*expanded)
+
+def _differentiate(expr: Expr, var: str) -> Expr:
+    if var not in expr.free_vars:
+        return Const(0)
+    v = Var(var)
+    drules = diff_rules(var)
+    srules = simplification_rules()
     result = Differentiate(expr, v)
+    top = rewrite_at(result, drules)
+    if top is not None:
+        result = _expand(evaluate_constants(top), drules)
+    # rewrite() returns the very same node when nothing applied, so the
+    # fix-point is reached once a full round leaves the node unchanged
     prev = None
-    while prev != repr(result):
-        prev = repr(result)
-        result = rewrite(result, diff_rules)
-        result = rewrite(result, simplification_rules())
+    while prev is not result:
+        prev = result
+        result = rewrite(result, drules)
+        result = rewrite(result, srules)
     return result
\ No newline at end of file
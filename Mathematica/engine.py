@@ -1,13 +1,18 @@
 # engine.py
 # (Pattern Matching, Substitution, Rewrite Engine, and Constant Folding implementation)
 
-from typing import Any, Dict, List, Tuple, Optional
+import math
+import operator
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple, Optional
+import logger
 from logger import log_step 
 
 # Import all needed Expression classes and PatternVar from rules.py for type hints and implementation
 from rules import (
-    Expr, Const, Var, PatternVar, Add, Mul, Sub, Div, Pow, 
+    Expr, Const, C, Var, PatternVar, Add, Mul, Sub, Div, Pow, 
     # Add other classes needed for 'evaluate_constants' and function bodies
+    Exp, Log, Sin, Cos, Tan, Sinh, Cosh, Tanh, ArcSin, ArcTan, Sqrt, _NODE_CLASSES,
+    _SMALL_CONSTS,
 ) 
 
 # ============================================================
@@ -15,35 +20,14 @@ from rules import (
 # ============================================================
 
 def match(pattern: Expr, expr: Expr, bindings: Optional[Dict[str, Expr]] = None) -> Optional[Dict[str, Expr]]:
-    if bindings is None: bindings = {}
-    if isinstance(pattern, PatternVar):
-        if pattern.name in bindings:
-            return bindings if bindings[pattern.name] == expr else None
-        bindings[pattern.name] = expr
-        return bindings
-    if type(pattern) is not type(expr): return None
-    if isinstance(pattern, Const):
-        pv = pattern.value
-        if isinstance(pv, PatternVar):
-            if pv.name in bindings:
-                return bindings if bindings[pv.name] == expr else None
-            bindings[pv.name] = expr
-            return bindings
-        return bindings if pattern.value == expr.value else None
-    if isinstance(pattern, Var):
-        pn = pattern.name
-        if isinstance(pn, PatternVar):
-            if pn.name in bindings:
-                return bindings if bindings[pn.name] == expr else None
-            bindings[pn.name] = expr
-            return bindings
-        return bindings if pattern.name == expr.name else None
-    for p_child, e_child in zip(pattern.children(), expr.children()):
-        bindings = match(p_child, e_child, bindings)
-        if bindings is None: return None
-    return bindings
+    # Runs the pattern's compiled program (see compile_pattern below): one
+    # loop over an explicit stack, no recursion and no children() lists.
+    return run_pattern(_program(pattern), expr, bindings)
 
 def substitute(expr: Expr, bindings: Dict[str, Expr]) -> Expr:
+    # A template subtree without pattern variables is returned as it is
+    # (nodes are immutable and interned) rather than rebuilt node by node.
+    if not expr.sig & _PATTERN_BIT: return expr
     if isinstance(expr, PatternVar): return bindings.get(expr.name, expr)
     if isinstance(expr, Const):
         v = expr.value
@@ -54,77 +38,515 @@ def substitute(expr: Expr, bindings: Dict[str, Expr]) -> Expr:
         if isinstance(n, PatternVar): return bindings.get(n.name, expr)
         return expr
     args = [substitute(child, bindings) for child in expr.children()]
-    return type(expr)(*args)
+    cls = type(expr)
+    # Fold constant arithmetic while instantiating the template (e.g. the
+    # power rule's n+1), instead of building it only for evaluate_constants.
+    if cls in _FOLDABLE and _is_number_const(args[0]) and _is_number_const(args[1]):
+        folded = _fold_values(cls, args[0].value, args[1].value)
+        if folded is not None: return folded
+    return cls(*args)
+
+_PATTERN_BIT = PatternVar._type_bit
+
+# ============================================================
+# Rule Representation
+# ============================================================
+
+class Rule(NamedTuple):
+    """A rewrite rule with its dispatch keys precomputed.
+
+    head / secondary are the exact types the pattern's root and first child
+    must have (None when that position is a PatternVar or absent).
+    program is the pattern compiled by compile_pattern(), and matcher the
+    same program turned into a Python function by compile_matcher().
+    sig is the set of node types (Expr.sig bits) any match must contain.
+    """
+    pattern: Expr
+    template: Expr
+    head: Optional[type]
+    secondary: Optional[type]
+    program: tuple
+    sig: int
+    matcher: Callable[[Expr], Optional[Dict[str, Expr]]]
+
+def make_rule(pattern: Expr, template: Expr) -> Rule:
+    program = compile_pattern(pattern)
+    matcher = compile_matcher(program)
+    sig = pattern.sig & ~PatternVar._type_bit
+    if isinstance(pattern, PatternVar):
+        return Rule(pattern, template, None, None, program, sig, matcher)
+    kids = pattern.children()
+    secondary = type(kids[0]) if kids and not isinstance(kids[0], PatternVar) else None
+    return Rule(pattern, template, type(pattern), secondary, program, sig, matcher)
+
+def make_rules(pairs) -> Tuple[Rule, ...]:
+    """Turn (pattern, replacement) pairs into a tuple of Rules."""
+    return tuple(make_rule(pattern, template) for pattern, template in pairs)
+
+# ------------------------------------------------------------
+# Compiled Patterns
+# ------------------------------------------------------------
+# A rule's pattern is flattened once, in pre-order, into a tuple of
+# (opcode, a, b) instructions. run_pattern() executes them against a stack
+# of subject nodes: each instruction pops one node and checks it, and
+# _ENTER pushes the node's children so the next instructions see them
+# left to right. This is match() without a Python call per pattern node.
+
+_ENTER, _BIND, _TYPED_BIND, _CONST, _VAR = range(5)
+_GROUND_OPS = (_ENTER, _CONST, _VAR)  # a pattern made only of these binds nothing
+
+def compile_pattern(pattern: Expr) -> tuple:
+    program = []
+    def emit(p: Expr) -> None:
+        cls = type(p)
+        if cls is PatternVar:
+            program.append((_BIND, p.name, None))
+        elif cls is Const:
+            if isinstance(p.value, PatternVar):
+                program.append((_TYPED_BIND, Const, p.value.name))
+            else:
+                program.append((_CONST, p.value, None))
+        elif cls is Var:
+            if isinstance(p.name, PatternVar):
+                program.append((_TYPED_BIND, Var, p.name.name))
+            else:
+                program.append((_VAR, p.name, None))
+        else:
+            names, child_idx = _layout(cls)
+            program.append((_ENTER, cls, tuple(names[i] for i in reversed(child_idx))))
+            for child in p.children():
+                emit(child)
+    emit(pattern)
+    return tuple(program)
+
+# A rule's program is also specialized once into straight-line Python: the
+# type checks and field reads of that one pattern, with no instruction
+# dispatch, and the bindings dict built only when the match succeeds.
+#
+#   (?x+0)  ->  def matcher(n0):
+#                   if type(n0) is not k2: return None     # k2 is Add
+#                   n1 = n0.right
+#                   n2 = n0.left
+#                   if type(n1) is not Const or n1.value != k3: return None
+#                   return {'x': n2}
+#
+# A small int constant is also compared by identity first: Const(0) and
+# Const(1), which the identity rules test for, are interned singletons, so a
+# hit costs one pointer compare. The value compare still catches 0.0 and 1.0.
+
+def compile_matcher(program: tuple) -> Callable[[Expr], Optional[Dict[str, Expr]]]:
+    """Python function equivalent to run_pattern(program, expr) with fresh bindings."""
+    namespace: Dict[str, Any] = {"Const": Const, "Var": Var}
+    lines = []
+    stack = ["n0"]
+    bound: Dict[str, str] = {}
+    count = 1
+
+    def ref(value) -> str:
+        name = "k%d" % len(namespace)
+        namespace[name] = value
+        return name
+
+    for op, a, b in program:
+        node = stack.pop()
+        if op == _ENTER:
+            lines.append("if type(%s) is not %s: return None" % (node, ref(a)))
+            for field in b:
+                child = "n%d" % count
+                count += 1
+                lines.append("%s = %s.%s" % (child, node, field))
+                stack.append(child)
+            continue
+        if op == _CONST:
+            test = "type(%s) is not Const or %s.value != %s" % (node, node, ref(a))
+            if type(a) is int and a in _SMALL_CONSTS:
+                test = "%s is not %s and (%s)" % (node, ref(_SMALL_CONSTS[a]), test)
+            lines.append("if %s: return None" % test)
+            continue
+        if op == _VAR:
+            lines.append("if type(%s) is not Var or %s.name != %s: return None" % (node, node, ref(a)))
+            continue
+        if op == _TYPED_BIND:
+            lines.append("if type(%s) is not %s: return None" % (node, ref(a)))
+            a = b
+        first = bound.get(a)
+        if first is None:
+            bound[a] = node
+        else:
+            lines.append("if %s is not %s and %s != %s: return None" % (node, first, node, first))
+    result = ", ".join("%r: %s" % (name, node) for name, node in bound.items())
+    lines.append("return {%s}" % result)
+    source = "def matcher(n0):\n" + "".join("    %s\n" % line for line in lines)
+    exec(source, namespace)
+    return namespace["matcher"]
+
+# Programs for patterns passed to match() directly (Rules carry their own),
+# by id; the pattern is kept alongside so its id stays valid.
+_PROGRAMS: Dict[int, Tuple[Expr, tuple]] = {}
+
+def _program(pattern: Expr) -> tuple:
+    hit = _PROGRAMS.get(id(pattern))
+    if hit is None:
+        hit = _PROGRAMS[id(pattern)] = (pattern, compile_pattern(pattern))
+    return hit[1]
+
+def run_pattern(program: tuple, expr: Expr, bindings: Optional[Dict[str, Expr]] = None) -> Optional[Dict[str, Expr]]:
+    """Match expr against a compiled pattern; bindings are extended in place."""
+    if bindings is None: bindings = {}
+    stack = [expr]
+    pop, push = stack.pop, stack.append
+    for op, a, b in program:
+        node = pop()
+        if op == _ENTER:
+            if type(node) is not a: return None
+            for name in b:
+                push(getattr(node, name))
+            continue
+        if op == _CONST:
+            if type(node) is not Const or node.value != a: return None
+            continue
+        if op == _VAR:
+            if type(node) is not Var or node.name != a: return None
+            continue
+        if op == _TYPED_BIND:
+            if type(node) is not a: return None
+            a = b
+        bound = bindings.get(a)
+        if bound is None:
+            bindings[a] = node
+        elif bound is not node and bound != node:
+            return None
+    return bindings
 
 # ============================================================
 # Rewrite Engine with Logging
 # ============================================================
 
+# The result of rewriting a node under a rule list depends on nothing else,
+# so rewrite() and rewrite_fixpoint() remember it per rule list, by node id
+# (node kept alongside). While the step log is on they neither consult nor
+# fill these tables, so every call still writes out all of its steps.
+
+def _memo_get(table: Dict[int, Tuple[Expr, Expr]], expr: Expr) -> Optional[Expr]:
+    if logger.LOG_ENABLED: return None
+    hit = table.get(id(expr))
+    return None if hit is None else hit[1]
+
+def _memo_put(table: Dict[int, Tuple[Expr, Expr]], expr: Expr, result: Expr) -> None:
+    if logger.LOG_ENABLED: return
+    if len(table) >= _NORMAL_LIMIT: table.clear()
+    table[id(expr)] = (expr, result)
+
 def rewrite(expr: Expr, rules: List[Tuple[Expr, Expr]]) -> Expr:
+    """Rewrite to a fix-point. Returns the very same node if nothing applied."""
+    table = _rule_index(rules).rewritten
+    hit = _memo_get(table, expr)
+    if hit is not None:
+        return hit
+    start = expr
     changed = True
     while changed:
         changed, expr = _rewrite_once(expr, rules)
         expr = evaluate_constants(expr)
+    _memo_put(table, start, expr)
+    return expr
+
+def rewrite_fixpoint(expr: Expr, rules: List[Tuple[Expr, Expr]], max_passes: Optional[int] = None) -> Expr:
+    """
+    Apply rules and constant folding until neither changes the tree.
+    Equivalent to looping rewrite() + evaluate_constants() until stable,
+    without the extra full passes spent confirming the fix-point.
+    Returns the very same node if nothing applied.
+    With max_passes, stops after that many rule applications and returns
+    the tree as it stands (a guard against rule sets that cycle).
+    """
+    if max_passes is not None:
+        return _rewrite_fixpoint(expr, rules, max_passes)
+    table = _rule_index(rules).fixpoints
+    hit = _memo_get(table, expr)
+    if hit is not None:
+        return hit
+    result = _rewrite_fixpoint(expr, rules, None)
+    _memo_put(table, expr, result)
+    return result
+
+def _rewrite_fixpoint(expr: Expr, rules: List[Tuple[Expr, Expr]], max_passes: Optional[int]) -> Expr:
+    passes = 0
+    while max_passes is None or passes < max_passes:
+        passes += 1
+        changed, expr = _rewrite_once(expr, rules)
+        folded = evaluate_constants(expr)
+        if not changed and folded is expr:
+            return expr
+        expr = folded
     return expr
 
+# ------------------------------------------------------------
+# Rule Index (two-level discrimination on head type)
+# ------------------------------------------------------------
+# A pattern can only match a node of exactly its own type, and its first
+# child can only match a first child of exactly that child's type (unless
+# the pattern child is a PatternVar). Rules are therefore bucketed by
+# (node type, first-child type), in their original order, so a node is
+# only tried against the rules that can possibly match it. Buckets are
+# filled lazily per rule list; the cache holds the list itself so its id
+# stays valid. Plain (pattern, replacement) pairs are turned into Rules
+# once, when the list is first seen.
+
+class _RuleIndex:
+    __slots__ = ("rules", "compiled", "buckets", "normal", "rewritten", "fixpoints")
+    def __init__(self, rules):
+        self.rules = rules  # held so id(rules) stays valid
+        self.compiled = tuple(r if isinstance(r, Rule) else make_rule(*r) for r in rules)
+        self.buckets: Dict[tuple, list] = {}
+        # Subtrees in which no rule matches at any node, by id (node kept alive)
+        self.normal: Dict[int, Expr] = {}
+        # Results of rewrite() / rewrite_fixpoint() by id: (node, result)
+        self.rewritten: Dict[int, Tuple[Expr, Expr]] = {}
+        self.fixpoints: Dict[int, Tuple[Expr, Expr]] = {}
+
+_INDEX_CACHE: Dict[int, _RuleIndex] = {}
+_INDEX_CACHE_LIMIT = 64
+_NORMAL_LIMIT = 100_000
+
+def _rule_index(rules) -> _RuleIndex:
+    index = _INDEX_CACHE.get(id(rules))
+    if index is None or index.rules is not rules:
+        if len(_INDEX_CACHE) >= _INDEX_CACHE_LIMIT: _INDEX_CACHE.clear()
+        index = _INDEX_CACHE[id(rules)] = _RuleIndex(rules)
+    return index
+
+# Ground rules (no pattern variables) can only match a node equal to their
+# pattern, so each bucket keeps them apart, in a dict keyed by the pattern's
+# structural hash, and a node looks up its own hash instead of trying them
+# one by one. Ground rules whose patterns share a hash are all kept, in
+# list order, and tried one after the other. The other rules keep their
+# position in the list so a ground rule still only wins over the rules that
+# come after it.
+
+def _candidates(expr: Expr, index: _RuleIndex) -> tuple:
+    """(pattern rules as (position, rule), {hash: [(position, ground rule), ...]}) for expr."""
+    kids = expr.children()
+    key = (type(expr), type(kids[0]) if kids else None)
+    bucket = index.buckets.get(key)
+    if bucket is None:
+        head, secondary = key
+        patterns, ground = [], {}
+        for pos, r in enumerate(r for r in index.compiled
+                                if r.head is None or (r.head is head and (r.secondary is None or r.secondary is secondary))):
+            if all(op in _GROUND_OPS for op, _, _ in r.program):
+                ground.setdefault(hash(r.pattern), []).append((pos, r))
+            else:
+                patterns.append((pos, r))
+        bucket = index.buckets[key] = (patterns, ground)
+    return bucket
+
+def _first_match(node: Expr, index: _RuleIndex) -> Optional[Tuple[Rule, Dict[str, Expr]]]:
+    """The first rule (in list order) matching node itself, with its bindings."""
+    patterns, ground = _candidates(node, index)
+    hits = ground.get(hash(node), ()) if ground else ()
+    j = 0  # next ground rule in hits to try
+    sig = node.sig
+    for pos, rule in patterns:
+        # ground rules that come before this one; a miss is a hash collision
+        while j < len(hits) and hits[j][0] < pos:
+            ground_rule = hits[j][1]
+            j += 1
+            bindings = ground_rule.matcher(node)
+            if bindings is not None: return ground_rule, bindings
+        # a rule needing a node type absent from the subtree cannot match
+        if rule.sig & ~sig: continue
+        bindings = rule.matcher(node)
+        if bindings is not None: return rule, bindings
+    for _, ground_rule in hits[j:]:
+        bindings = ground_rule.matcher(node)
+        if bindings is not None: return ground_rule, bindings
+    return None
+
+# Per-class field layout: (all field names, indices of the Expr-typed ones).
+# Computed once per node class instead of inspecting __dataclass_fields__
+# at every node of every pass.
+_LAYOUTS: Dict[type, Tuple[Tuple[str, ...], Tuple[int, ...]]] = {}
+
+def _layout(cls: type) -> Tuple[Tuple[str, ...], Tuple[int, ...]]:
+    layout = _LAYOUTS.get(cls)
+    if layout is None:
+        fields = tuple(getattr(cls, "__dataclass_fields__", {}).values())
+        names = tuple(f.name for f in fields)
+        child_idx = tuple(i for i, f in enumerate(fields)
+                          if isinstance(f.type, type) and issubclass(f.type, Expr))
+        layout = _LAYOUTS[cls] = (names, child_idx)
+    return layout
+
 def _rewrite_once(expr: Expr, rules: List[Tuple[Expr, Expr]]) -> Tuple[bool, Expr]:
-    for pattern, replacement in rules:
-        bindings = match(pattern, expr)
-        if bindings is not None:
-            new_expr = substitute(replacement, bindings)
-            log_step(f"{pattern} -> {replacement} on {expr}")
-            return True, new_expr
-            
-    fields = getattr(expr, "__dataclass_fields__", {})
-    field_names = list(fields.keys())
-
-    for field in field_names: # 'field' is the name string, e.g. "left"
-        val = getattr(expr, field)
-        if isinstance(val, Expr):
-            changed, new_val = _rewrite_once(val, rules)
-            if changed:
-                # Create a new instance with the rewritten child
-                new_args = [getattr(expr, name) for name in field_names]
-                # 'field' is the name of the attribute that was changed, so we find its index
-                new_args[field_names.index(field)] = new_val
-                
-                return True, type(expr)(*new_args)
+    # Iterative pre-order walk (leftmost-outermost first, as before). Each stack
+    # entry carries a link (parent, field index, parent's link) so that, on
+    # the first rule that fires, only the chain of ancestors is rebuilt.
+    #
+    # Whether a rule matches depends on the node alone, and nodes are interned,
+    # so a subtree once found free of matches stays so. Such subtrees are
+    # remembered per rule list and skipped by later passes: the rewrite still
+    # fires at the same leftmost-outermost node, without re-scanning the
+    # unchanged part of the tree before it.
+    index = _rule_index(rules)
+    normal = index.normal
+    visited = []
+    stack = [(expr, None)]
+    while stack:
+        node, link = stack.pop()
+        if id(node) in normal:
+            continue
+        found = _first_match(node, index)
+        if found is not None:
+            rule, bindings = found
+            new_node = substitute(rule.template, bindings)
+            log_step("%s -> %s on %s", rule.pattern, rule.template, node)
+            # Everything visited before this node, except its ancestors, had
+            # its whole subtree scanned without a match.
+            ancestors = set()
+            while link is not None:
+                parent, index_in_parent, link = link
+                ancestors.add(id(parent))
+                new_args = [getattr(parent, name) for name in _layout(type(parent))[0]]
+                new_args[index_in_parent] = new_node
+                new_node = type(parent)(*new_args)
+            _remember_normal(normal, (n for n in visited if id(n) not in ancestors))
+            return True, new_node
+        visited.append(node)
+
+        field_names, child_idx = _layout(type(node))
+        for i in reversed(child_idx):
+            stack.append((getattr(node, field_names[i]), (node, i, link)))
+    _remember_normal(normal, visited)
     return False, expr
 
+def rewrite_at(expr: Expr, rules: List[Tuple[Expr, Expr]]) -> Optional[Expr]:
+    """
+    Apply the first rule that matches expr itself (its subtrees are not
+    searched), as _rewrite_once would at that node. None if no rule applies.
+    """
+    found = _first_match(expr, _rule_index(rules))
+    if found is None:
+        return None
+    rule, bindings = found
+    new_node = substitute(rule.template, bindings)
+    log_step("%s -> %s on %s", rule.pattern, rule.template, expr)
+    return new_node
+
+def _remember_normal(normal: Dict[int, Expr], nodes) -> None:
+    if len(normal) >= _NORMAL_LIMIT: normal.clear()
+    for node in nodes:
+        normal[id(node)] = node
+
 # ============================================================
 # Constant Folding
 # ============================================================
 
+_FOLDABLE = (Add, Sub, Mul, Div, Pow)
+
+def _is_number_const(expr: Expr) -> bool:
+    return isinstance(expr, Const) and isinstance(expr.value, (int, float))
+
+# Arithmetic of the foldable nodes, by exact type (Pow has edge cases)
+_ARITHMETIC = {Add: operator.add, Sub: operator.sub, Mul: operator.mul, Div: operator.truediv}
+
+# Like CPython's AST optimizer, integer results are only folded while they
+# stay small: a rule set that builds 10^(10^10) or n*n*... on big operands
+# would otherwise burn time and memory on a number that is never printed
+# usefully. Such nodes, and x/0 or a float overflow, are left unfolded.
+_MAX_FOLD_BITS = 1024
+
+def _fold_values(cls: type, a, b) -> Optional[Const]:
+    """Value of the binary node cls(Const(a), Const(b)); None to leave it unfolded."""
+    op = _ARITHMETIC.get(cls)
+    if op is not None:
+        if cls is Mul and type(a) is int and type(b) is int and a and b \
+                and a.bit_length() + b.bit_length() > _MAX_FOLD_BITS:
+            return None
+        try:
+            return C(op(a, b))
+        except (ZeroDivisionError, OverflowError):
+            return None
+    # --- Pow: handle edge cases ---
+    if a == 0 and b == 0:
+        return C(1)  # define 0^0 = 1 symbolically
+    if a == 0 and b < 0:
+        return Const(float("inf"))  # symbolic infinity
+    if type(a) is int and type(b) is int and b > 0 and a not in (-1, 0, 1) \
+            and abs(a).bit_length() * b > _MAX_FOLD_BITS:
+        return None
+    try:
+        return C(a ** b)
+    except (ZeroDivisionError, OverflowError):
+        return None
+
+# Operand fields of each foldable binary node, looked up by exact type
+_BINARY_FIELDS: Dict[type, Tuple[str, str]] = {
+    Add: ("left", "right"), Sub: ("left", "right"), Mul: ("left", "right"),
+    Div: ("left", "right"), Pow: ("base", "exp"),
+}
+
+# Leaves fold to themselves; children of these types are not recursed into,
+# which saves a call frame for about half the nodes of a typical tree.
+_LEAVES = frozenset((Const, Var))
+
+# Node classes with a single "arg" field (functions and Neg)
+_UNARY = frozenset(cls for cls in _NODE_CLASSES if _layout(cls)[0] == ("arg",))
+
+# Functions with an exact value at an integer argument: f(a) for the
+# (type, a) keys below. Only exact values, so nothing turns into a float.
+_EXACT_VALUES: Dict[Tuple[type, int], int] = {
+    (Sin, 0): 0, (Tan, 0): 0, (Cos, 0): 1,
+    (Exp, 0): 1, (Log, 1): 0,
+    (Sinh, 0): 0, (Tanh, 0): 0, (Cosh, 0): 1,
+    (ArcSin, 0): 0, (ArcTan, 0): 0, (Sqrt, 0): 0, (Sqrt, 1): 1,
+}
+
+# Float arguments Log folds to 1: e itself and e as written in the rules.
+# Nothing else, since log(2.718) is not 1.
+_E_VALUES = frozenset((math.e, 2.71828))
+
+# Folding depends on the node alone, and nodes are interned, so results are
+# remembered by id (the node is kept alongside so its id stays valid). Every
+# rewrite pass refolds the whole tree; the unchanged subtrees now answer
+# from here instead of being walked again.
+_FOLD_MEMO: Dict[int, Tuple[Expr, Expr]] = {}
+_FOLD_MEMO_LIMIT = 100_000
+
 def evaluate_constants(expr: Expr) -> Expr:
-    if isinstance(expr, Add):
-        left, right = evaluate_constants(expr.left), evaluate_constants(expr.right)
-        if isinstance(left, Const) and isinstance(right, Const): return Const(left.value + right.value)
-        return Add(left, right)
-    if isinstance(expr, Mul):
-        left, right = evaluate_constants(expr.left), evaluate_constants(expr.right)
-        if isinstance(left, Const) and isinstance(right, Const): return Const(left.value * right.value)
-        return Mul(left, right)
-    if isinstance(expr, Sub):
-        left, right = evaluate_constants(expr.left), evaluate_constants(expr.right)
-        if isinstance(left, Const) and isinstance(right, Const): return Const(left.value - right.value)
-        return Sub(left, right)
-    if isinstance(expr, Div):
-        left, right = evaluate_constants(expr.left), evaluate_constants(expr.right)
-        if isinstance(left, Const) and isinstance(right, Const): return Const(left.value / right.value)
-        return Div(left, right)
-    if isinstance(expr, Pow):
-        base, exp = evaluate_constants(expr.base), evaluate_constants(expr.exp)
-        if isinstance(base, Const) and isinstance(exp, Const):
-            # --- handle edge cases ---
-            if base.value == 0 and exp.value == 0:
-                return Const(1)  # define 0^0 = 1 symbolically
-            if base.value == 0 and exp.value < 0:
-                return Const(float("inf"))  # symbolic infinity
-            return Const(base.value ** exp.value)
-        return Pow(base, exp)
+    """Fold constant arithmetic bottom-up. Returns the very same node if nothing folded."""
+    hit = _FOLD_MEMO.get(id(expr))
+    if hit is not None:
+        return hit[1]
+    result = _evaluate_constants(expr)
+    if len(_FOLD_MEMO) >= _FOLD_MEMO_LIMIT: _FOLD_MEMO.clear()
+    _FOLD_MEMO[id(expr)] = (expr, result)
+    return result
+
+def _evaluate_constants(expr: Expr) -> Expr:
+    cls = type(expr)
+    fields = _BINARY_FIELDS.get(cls)
+    if fields is not None:
+        a, b = getattr(expr, fields[0]), getattr(expr, fields[1])
+        left = a if type(a) in _LEAVES else evaluate_constants(a)
+        right = b if type(b) in _LEAVES else evaluate_constants(b)
+        if isinstance(left, Const) and isinstance(right, Const):
+            folded = _fold_values(cls, left.value, right.value)
+            if folded is not None: return folded
+        if left is a and right is b: return expr
+        return cls(left, right)
     # Recursively apply constant folding to unary functions
-    if hasattr(expr, 'arg'):
-        new_arg = evaluate_constants(expr.arg)
-        if new_arg != expr.arg:
-            return type(expr)(new_arg)
-    return expr
\ No newline at end of file
+    if cls in _UNARY:
+        arg = expr.arg
+        new_arg = arg if type(arg) in _LEAVES else evaluate_constants(arg)
+        if type(new_arg) is Const:
+            value = new_arg.value
+            if type(value) is int:
+                value = _EXACT_VALUES.get((cls, value))
+                if value is not None:
+                    return C(value)
+            elif cls is Log and type(value) is float and value in _E_VALUES:
+                return C(1)  # log(e), also for e rounded (2.71828)
+        if new_arg is not arg:
+            return cls(new_arg)
+    return expr
@@ -4,75 +4,68 @@
 
 from rules import *  # imports Expr, Add, Mul, rewrite, simplification_rules, evaluate_constants
 from simplification import *
-def check_equal(expr1: Expr, expr2: Expr) -> bool:
+from typing import Optional
+
+def check_equal(expr1: Expr, expr2: Expr, simplified2: Optional[Expr] = None) -> bool:
     """
     Determine if two expressions are mathematically equivalent
     by applying the rewrite engine and simplification rules.
     Handles associativity for Add and Mul.
+    simplified2, if given, is simplify_all(expr2) computed ahead of time.
     """
 
-    # --------------------------------------------------------
-    # Simplify expression repeatedly until stable
-    # --------------------------------------------------------
-    def simplify(expr: Expr) -> Expr:
-        prev = None
-        while prev != repr(expr):
-            prev = repr(expr)
-            expr = rewrite(expr, simplification_rules())
-            expr = evaluate_constants(expr)
-        return expr
-
-    # --------------------------------------------------------
-    # Flatten associative operations (Add, Mul)
-    # --------------------------------------------------------
-    def flatten_add(expr):
-        if isinstance(expr, Add):
-            return flatten_add(expr.left) + flatten_add(expr.right)
-        return [expr]
-
-    def flatten_mul(expr):
-        if isinstance(expr, Mul):
-            return flatten_mul(expr.left) + flatten_mul(expr.right)
-        return [expr]
-
-    # --------------------------------------------------------
-    # Canonicalize structure (order-insensitive for Add/Mul)
-    # --------------------------------------------------------
-    def canonicalize(expr: Expr) -> Expr:
-        if isinstance(expr, Add):
-            terms = sorted([repr(t) for t in flatten_add(expr)])
-            return terms  # return canonical list representation
-        if isinstance(expr, Mul):
-            factors = sorted([repr(f) for f in flatten_mul(expr)])
-            return factors
-        if isinstance(expr, Sub):
-            return Sub(canonicalize(expr.left), canonicalize(expr.right))
-        if isinstance(expr, Div):
-            return Div(canonicalize(expr.left), canonicalize(expr.right))
-        if isinstance(expr, Pow):
-            return Pow(canonicalize(expr.base), canonicalize(expr.exp))
-        if isinstance(expr, Exp):
-            return Exp(canonicalize(expr.arg))
-        if isinstance(expr, Log):
-            return Log(canonicalize(expr.arg))
-        if isinstance(expr, Sin):
-            return Sin(canonicalize(expr.arg))
-        if isinstance(expr, Cos):
-            return Cos(canonicalize(expr.arg))
-        if isinstance(expr, Tan):
-            return Tan(canonicalize(expr.arg))
-        return expr
+    # Nodes are interned: structurally identical trees are the same object,
+    # and Expr.__eq__ is identity unless STRICT_STRUCTURAL_EQ is set.
+    # Failing this shortcut proves nothing: structurally different trees can
+    # still be mathematically equal, which the checks below decide.
+    if expr1 == expr2:
+        return True
 
     # --------------------------------------------------------
     # Comparison logic
     # --------------------------------------------------------
-    e1 = canonicalize(simplify(expr1))
-    e2 = canonicalize(simplify(expr2))
+    # Simplify each side to a fix-point (rules + constant folding) first,
+    # then compare the order-insensitive normal forms.
+    if simplified2 is None:
+        simplified2 = simplify_all(expr2)
+    return normal_form(simplify_all(expr1)) == normal_form(simplified2)
 
-    def equivalent(a, b):
-        # If flattened lists (Add/Mul terms), compare as sets
-        if isinstance(a, list) and isinstance(b, list):
-            return sorted(a) == sorted(b)
-        return repr(a) == repr(b)
 
-    return equivalent(e1, e2)
+# --------------------------------------------------------
+# Flatten associative operations (Add, Mul)
+# --------------------------------------------------------
+def _flatten(expr: Expr, op: type) -> list:
+    # Operands of a chain of op, left to right, into one list (no
+    # concatenation of partial lists, no recursion on long chains).
+    out = []
+    stack = [expr]
+    while stack:
+        e = stack.pop()
+        if type(e) is op:
+            stack.append(e.right)
+            stack.append(e.left)
+        else:
+            out.append(e)
+    return out
+
+# --------------------------------------------------------
+# Canonical structure (order-insensitive for Add/Mul)
+# --------------------------------------------------------
+def normal_form(expr: Expr) -> tuple:
+    """
+    Hashable normal form of expr: nested tuples tagged by node type, with
+    Add/Mul chains flattened and their operands sorted, at every level.
+    Two expressions with equal normal forms differ only by reordering or
+    regrouping sums and products.
+    """
+    cls = type(expr)
+    if cls is Add or cls is Mul:
+        return (cls.__name__,) + tuple(sorted(normal_form(t) for t in _flatten(expr, cls)))
+    if cls is Const:
+        return ("Const", expr.value)
+    if cls is Var:
+        return ("Var", expr.name)
+    children = expr.children()
+    if children:
+        return (cls.__name__,) + tuple(normal_form(c) for c in children)
+    return (cls.__name__, repr(expr))
@@ -2,65 +2,112 @@
 # integration.py — Hierarchical Integration Engine (FIXED)
 # ============================================================
 
-from rules import Expr, Var, Const, Add, Sub, Mul, Div, Pow, Exp, Log, Sin, Cos, Neg, Integrate, rewrite, Sinh, Sec 
-from simplification import simplification_rules, evaluate_constants
+from rules import Expr, Var, Const, C, Add, Sub, Mul, Div, Pow, Exp, Log, Sin, Cos, Neg, Integrate, rewrite, Sinh, Sec, Cosh, Tan, Abs
+from simplification import simplification_rules, simplify_all, evaluate_constants
 from equality import check_equal
-from logger import log_step, reset_log, get_step_counter, LOG_FILE, push_depth, pop_depth, get_depth 
-from typing import Optional
+from logger import log_step, reset_log, get_step_counter, enable_log, LOG_FILE
+from typing import Callable, Dict, Optional
 
 # New imports from modularized files
 from integration_rules import integration_rules
-from integration_strategies import try_u_substitution, try_integration_by_parts 
+from integration_strategies import try_u_substitution, try_integration_by_parts, clear_strategy_caches
+from differentiation import clear_diff_cache
+
+# ------------------------------------------------------------
+# Elementary Dispatch Table
+# ------------------------------------------------------------
+# The most common integrands are answered directly from their head type,
+# without running the rule rewriter or the strategy search. Each handler
+# mirrors the matching entry in integration_rules() and returns None when
+# the shape is not the exact elementary case.
+
+def _int_pow(e: Pow, v: Var) -> Optional[Expr]:
+    if isinstance(e.base, Sec) and e.base.arg == v and isinstance(e.exp, Const) and e.exp.value == 2:
+        return Tan(v)
+    if e.base != v or not isinstance(e.exp, Const):
+        return None
+    if e.exp.value == -1:
+        return Log(Abs(v))
+    n_plus_1 = Const(e.exp.value + 1)
+    return Div(Pow(v, n_plus_1), n_plus_1)
+
+def _int_exp(e: Exp, v: Var) -> Optional[Expr]:
+    if e.arg == v:
+        return Exp(v)
+    if isinstance(e.arg, Mul) and isinstance(e.arg.left, Const) and e.arg.right == v:
+        k = e.arg.left.value
+        # exp(0*x) is a constant, not a case of this rule; leave it to the
+        # rewriter like any non-numeric coefficient
+        if isinstance(k, (int, float)) and k != 0:
+            return Mul(Div(C(1), e.arg.left), e)
+    return None
+
+_ELEMENTARY: Dict[type, Callable[[Expr, Var], Optional[Expr]]] = {
+    Const: lambda e, v: C(0) if e.value == 0 else Mul(e, v),
+    Var:   lambda e, v: Div(Pow(v, C(2)), C(2)) if e == v else None,
+    Pow:   _int_pow,
+    Exp:   _int_exp,
+    Cos:   lambda e, v: Sin(v) if e.arg == v else None,
+    Sin:   lambda e, v: Neg(Cos(v)) if e.arg == v else None,
+    Sinh:  lambda e, v: Cosh(v) if e.arg == v else None,
+    Cosh:  lambda e, v: Sinh(v) if e.arg == v else None,
+}
 
 # ------------------------------------------------------------
 # Main Integration Driver
 # ------------------------------------------------------------
-def integrate(expr: Expr, var: str, reset: bool = True) -> Expr:
+def integrate(expr: Expr, var: str, reset: bool = True, depth: int = 0) -> Expr:
     v = Var(var)
-    log_step(f"Integrating expression: {expr}")
+    log_step("Integrating expression: %s", expr)
 
     if reset:
-        push_depth()
-    
-    if get_depth() > 20: 
+        clear_diff_cache()
+        clear_strategy_caches()
+
+    if depth > 20: 
         log_step("Recursion depth limit reached (20). Returning integral unsolved.")
-        if reset: pop_depth()
         return expr if isinstance(expr, Integrate) else Integrate(expr, v) 
 
+    # 0. Elementary integrands are answered straight from the dispatch table.
+    handler = _ELEMENTARY.get(type(expr))
+    if handler is not None:
+        direct = handler(expr, v)
+        if direct is not None:
+            result = rewrite(evaluate_constants(direct), simplification_rules())
+            log_step("[Elementary Table] Antiderivative found: %s", result)
+            return result
+
+    srules = simplification_rules()
+    irules = integration_rules(var)
+
     # 1. Simplify the expression algebraically (needed for 1/x^3 -> x^-3)
-    prev_expr_repr = None
-    while prev_expr_repr != repr(expr):
-        prev_expr_repr = repr(expr)
-        expr = rewrite(expr, simplification_rules())
-        expr = evaluate_constants(expr)
+    expr = simplify_all(expr)
         
     # 2. Apply elementary/direct rules (Power Rule, Log Rule, Linearity, etc.)
     integral_expr = Integrate(expr, v)
     
     # CRITICAL FIX: Robustly apply direct rules and simplify until stable.
-    prev_integral_repr = None
     while True:
-        prev_integral_repr = repr(integral_expr)
+        prev_integral = integral_expr
         
         # Apply integration rules (Power Rule, Linearity, etc.)
-        integral_expr = rewrite(integral_expr, integration_rules(var))
+        integral_expr = rewrite(integral_expr, irules)
         
         # If the direct rule application yielded a result (i.e., not an Integrate), return it.
         if not isinstance(integral_expr, Integrate):
             # CRITICAL: Simplify the result (e.g., calculates -3+1=-2)
             result = evaluate_constants(integral_expr)
-            result = rewrite(result, simplification_rules())
-            log_step(f"[Direct Rule Success] Antiderivative found: {result}")
-            if reset: pop_depth()
+            result = rewrite(result, srules)
+            log_step("[Direct Rule Success] Antiderivative found: %s", result)
             return result # Return the fully simplified result
 
         # Simplify the integrand/arguments of the new integral.
-        new_expr = rewrite(integral_expr.expr, simplification_rules())
-        new_expr = evaluate_constants(new_expr)
-        integral_expr = Integrate(new_expr, v)
+        new_expr = evaluate_constants(rewrite(integral_expr.expr, srules))
+        if new_expr is not integral_expr.expr:
+            integral_expr = Integrate(new_expr, v)
         
         # If applying rules AND simplifying the integrand didn't change the expression, break.
-        if prev_integral_repr == repr(integral_expr):
+        if integral_expr is prev_integral:
             break
     
     # 3. Apply Strategies on the fully simplified integrand, if direct rules failed.
@@ -70,23 +117,20 @@ def integrate(expr: Expr, var: str, reset: bool = True) -> Expr:
     u_sub_result = try_u_substitution(current_expr, v)
     if u_sub_result is not None and not isinstance(u_sub_result, Integrate):
         result = evaluate_constants(u_sub_result)
-        result = rewrite(result, simplification_rules())
-        log_step(f"U-Substitution successful: {result}")
-        if reset: pop_depth()
+        result = rewrite(result, srules)
+        log_step("U-Substitution successful: %s", result)
         return result
-    
+
     # 3b. Try Integration by Parts
-    ibp_result = try_integration_by_parts(current_expr, v, integrate_fn=integrate)
+    ibp_result = try_integration_by_parts(current_expr, v, integrate_fn=integrate, depth=depth)
     if ibp_result is not None and not isinstance(ibp_result, Integrate):
         result = evaluate_constants(ibp_result)
-        result = rewrite(result, simplification_rules())
-        log_step(f"Integration by Parts successful: {result}")
-        if reset: pop_depth()
+        result = rewrite(result, srules)
+        log_step("Integration by Parts successful: %s", result)
         return result
 
     # 4. Fallback: If no strategy or rule worked, return the final unsolved integral.
-    log_step(f"All strategies and direct rules failed. Returning unsolved integral.")
-    if reset: pop_depth()
+    log_step("All strategies and direct rules failed. Returning unsolved integral.")
     
     return integral_expr
 
@@ -94,6 +138,7 @@ def integrate(expr: Expr, var: str, reset: bool = True) -> Expr:
 if __name__ == "__main__":
 
     print("\n=== Integration Debug Harness (Hierarchical Logger) ===\n")
+    enable_log()
 
 
 
@@ -1,10 +1,12 @@
 # integration_rules.py
 # Foundational integration rules for linearity and elementary antiderivatives.
 
-from rules import Expr, Var, Integrate, Add, Mul, Const, Div, Pow, Exp, Cos, Sin, Neg, PatternVar, Log, Abs, Sinh, Cosh, Tan, ArcTan, Sec, ArcSin, Sub
+from functools import lru_cache
+from rules import Expr, Rule, make_rules, Var, Integrate, Add, Mul, Const, C, Div, Pow, Exp, Cos, Sin, Neg, PatternVar, Log, Abs, Sinh, Cosh, Tan, ArcTan, Sec, ArcSin, Sub
 
-def integration_rules(var: str) -> list[tuple[Expr, Expr]]:
-    """Foundational integration rules for linearity and elementary antiderivatives."""
+@lru_cache(maxsize=8)
+def integration_rules(var: str) -> tuple[Rule, ...]:
+    """Foundational integration rules for linearity and elementary antiderivatives (built once per variable)."""
     v = Var(var)
     n = PatternVar("n") # Use a single PatternVar instance for consistency
     c = PatternVar("c")
@@ -13,36 +15,36 @@ def integration_rules(var: str) -> list[tuple[Expr, Expr]]:
     
     # Define helper variables for generalized inverse trig rules
     a_sq = PatternVar("a_sq") 
-    a = Pow(Const(a_sq), Div(Const(1), Const(2))) # Represents sqrt(a^2)
+    a = Pow(Const(a_sq), Div(C(1), C(2))) # Represents sqrt(a^2)
 
-    return [
+    return make_rules((
         # --- Linearity ---
         (Integrate(Add(u, w), v), Add(Integrate(u, v), Integrate(w, v))),
         (Integrate(Mul(Const(c), u), v), Mul(Const(c), Integrate(u, v))),
         (Integrate(Neg(u), v), Neg(Integrate(u, v))),
 
         # --- Constants ---
-        (Integrate(Const(0), v), Const(0)),
+        (Integrate(C(0), v), C(0)),
         (Integrate(Const(c), v), Mul(Const(c), v)),
 
         # --- Log Rule (n = -1, MUST BE FIRST) ---
-        (Integrate(Pow(v, Const(-1)), v), Log(Abs(v))),
-        (Integrate(v, v), Div(Pow(v, Const(2)), Const(2))),
+        (Integrate(Pow(v, C(-1)), v), Log(Abs(v))),
+        (Integrate(v, v), Div(Pow(v, C(2)), C(2))),
         
         # --- CRITICAL FIX 1: Power Rule for Negative Integers (via Negation) ---
         (Integrate(Pow(v, Neg(Const(n))), v),
-          Div(Pow(v, Add(Neg(Const(n)), Const(1))),
-              Add(Neg(Const(n)), Const(1)))),
+          Div(Pow(v, Add(Neg(Const(n)), C(1))),
+              Add(Neg(Const(n)), C(1)))),
 
         # --- CRITICAL FIX 2: Power Rule (General case, handles x^3) ---
         (Integrate(Pow(v, Const(n)), v),
-          Div(Pow(v, Add(Const(n), Const(1))),
-              Add(Const(n), Const(1)))),
+          Div(Pow(v, Add(Const(n), C(1))),
+              Add(Const(n), C(1)))),
 
         # --- NEW CRITICAL RULE: Linear Exponential (e^(c*x)) ---
         # This solves ∫ e^(c*x) dx = (1/c) * e^(c*x) and fixes the ODE issue.
         (Integrate(Exp(Mul(Const(c), v)), v),
-         Mul(Div(Const(1), Const(c)), Exp(Mul(Const(c), v)))),
+         Mul(Div(C(1), Const(c)), Exp(Mul(Const(c), v)))),
 
         # --- Exponential & Trig (e^x case remains) ---
         (Integrate(Exp(v), v), Exp(v)),
@@ -54,13 +56,13 @@ def integration_rules(var: str) -> list[tuple[Expr, Expr]]:
         (Integrate(Cosh(v), v), Sinh(v)),
 
         # --- Trig Antiderivative Seeds (sec^2) ---
-        (Integrate(Pow(Sec(v), Const(2)), v), Tan(v)),
+        (Integrate(Pow(Sec(v), C(2)), v), Tan(v)),
 
         # --- Inverse Trig (ArcTan: 1/(a^2+x^2)) ---
-        (Integrate(Div(Const(1), Add(Const(a_sq), Pow(v, Const(2)))), v),
-          Mul(Div(Const(1), a), ArcTan(Div(v, a)))),
+        (Integrate(Div(C(1), Add(Const(a_sq), Pow(v, C(2)))), v),
+          Mul(Div(C(1), a), ArcTan(Div(v, a)))),
 
         # --- Inverse Trig (ArcSin: 1/sqrt(a^2-x^2)) ---
-        (Integrate(Div(Const(1), Pow(Sub(Const(a_sq), Pow(v, Const(2))), Div(Const(1), Const(2)))), v),
+        (Integrate(Div(C(1), Pow(Sub(Const(a_sq), Pow(v, C(2))), Div(C(1), C(2)))), v),
           ArcSin(Div(v, a))),
-    ]
\ No newline at end of file
+    ))
@@ -2,12 +2,22 @@
 # logger.py — Hierarchical Step Logger for Symbolic Engine
 # ============================================================
 
+import atexit
 import os
 import sys
+from contextlib import contextmanager
 
 LOG_FILE = "rewrite_log.txt"
 STEP_COUNTER = 0
 DEPTH = 0
+LOG_ENABLED = False  # off by default; debug harnesses turn it on with enable_log()
+VERBOSE_RESET = sys.stdout.isatty()  # reset banner only on an interactive terminal
+
+# Log lines are buffered and written in batches through one open handle,
+# instead of opening and closing the file for every step.
+_BUF: list = []
+_FH = None
+_FLUSH_AT = 4096
 
 
 # ---------------- Depth Control ----------------
@@ -25,6 +35,17 @@ def pop_depth():
         DEPTH -= 1
 
 
+@contextmanager
+def depth():
+    """Indent the log one level for the duration of a with-block (balanced even on exceptions)."""
+    global DEPTH
+    DEPTH += 1
+    try:
+        yield
+    finally:
+        DEPTH -= 1
+
+
 def get_depth():
     """Return current recursion depth."""
     return DEPTH
@@ -32,20 +53,37 @@ def get_depth():
 
 # ---------------- Step Logging ----------------
 
-def log_step(description: str, printout=False):
-    """Record a single log step with indentation according to recursion depth."""
+def enable_log():
+    """Turn step logging on."""
+    global LOG_ENABLED
+    LOG_ENABLED = True
+
+
+def disable_log():
+    """Turn step logging off (log_step becomes a no-op)."""
+    global LOG_ENABLED
+    LOG_ENABLED = False
+
+
+def log_step(description: str, *args, printout=False):
+    """
+    Record a single log step with indentation according to recursion depth.
+    Like the logging module, `description % args` is only formatted when
+    logging is enabled, so expression arguments are not printed for nothing.
+    """
+    if not LOG_ENABLED:
+        return
     global STEP_COUNTER
     STEP_COUNTER += 1
+    if args:
+        description = description % args
 
     indent = "  " * DEPTH
     message = f"[depth {DEPTH}] {description}"
 
-    # Write safely using UTF-8 (handles symbols like ∫, π, etc.)
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(f"step {STEP_COUNTER}: {indent}{message}\n")
-    except Exception as e:
-        print(f"[Logger Error] Could not write to log: {e}", file=sys.stderr)
+    _BUF.append(f"step {STEP_COUNTER}: {indent}{message}\n")
+    if len(_BUF) >= _FLUSH_AT:
+        flush_log()
 
     # Print to console — also handle Unicode safely
     if printout:
@@ -56,22 +94,45 @@ def log_step(description: str, printout=False):
             print(f"step {STEP_COUNTER}: {indent}{safe_msg}")
 
 
+def flush_log():
+    """Write any buffered log lines to the log file."""
+    global _FH
+    if not _BUF:
+        return
+    # Write safely using UTF-8 (handles symbols like ∫, π, etc.)
+    try:
+        if _FH is None:
+            _FH = open(LOG_FILE, "a", encoding="utf-8")
+        _FH.writelines(_BUF)
+        _FH.flush()
+    except Exception as e:
+        print(f"[Logger Error] Could not write to log: {e}", file=sys.stderr)
+    _BUF.clear()
+
+
+atexit.register(flush_log)
+
+
 def reset_log():
     """Reset the step counter and clear the log file."""
     global STEP_COUNTER, DEPTH
 
-    # --- Stylized reset banner in PURPLE ---
-    PURPLE, GREEN, YELLOW, RESET = "\033[95m", "\033[92m", "\033[93m", "\033[0m"
-    print(f"{PURPLE}* {YELLOW}LOG AND STEP COUNTER RESET INITIATED{PURPLE} *")
-    print(f"{PURPLE}* {GREEN}STARTING A CLEAN TEST RUN NOW!{PURPLE}      *")
-    print(f"{PURPLE}=" * 40 + RESET)
-    # ---------------------------------------
+    if VERBOSE_RESET:
+        # --- Stylized reset banner in PURPLE ---
+        PURPLE, GREEN, YELLOW, RESET = "\033[95m", "\033[92m", "\033[93m", "\033[0m"
+        print(f"{PURPLE}* {YELLOW}LOG AND STEP COUNTER RESET INITIATED{PURPLE} *")
+        print(f"{PURPLE}* {GREEN}STARTING A CLEAN TEST RUN NOW!{PURPLE}      *")
+        print(f"{PURPLE}=" * 40 + RESET)
+        # ---------------------------------------
 
     STEP_COUNTER = 0
     DEPTH = 0
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        f.write("")
-
+    _BUF.clear()
+    # The persistent handle is in append mode, so it stays usable after truncation
+    try:
+        os.truncate(LOG_FILE, 0)
+    except FileNotFoundError:
+        open(LOG_FILE, "w", encoding="utf-8").close()
 
 
 def get_step_counter() -> int:
@@ -1,12 +1,20 @@
 import os
-from logger import reset_log, get_step_counter, LOG_FILE
+from logger import reset_log, get_step_counter, enable_log, LOG_FILE
 from rules import Var, Const, Add, Sub, Mul, Div, Pow, Exp, Log, Sin, Cos, Tan, Neg, Sec, rewrite, Integrate
-from differentiation import differentiate
+from differentiation import differentiate, clear_diff_cache
 from integration import integrate 
 from equality import check_equal
-from simplification import simplification_rules
+from simplification import simplification_rules, simplify_all, evaluate_constants
 from tests import TESTS
 
+# Simplify every expected result once, up front; check_equal() then only
+# has to simplify the computed side.
+for _test in TESTS:
+    _test["expected_simplified"] = simplify_all(_test["expected"])
+
+# Set to True to write the step-by-step rewrite log while debugging
+DEBUG_LOG = False
+
 # --- Console Colors ---
 RED, GREEN, YELLOW, RESET = "\033[91m", "\033[92m", "\033[93m", "\033[0m"
 
@@ -40,25 +48,35 @@ def run_test(test):
     expr = test["expr"]
     expected_expr = test["expected"]
     is_integrate = test.get("integrate_only", False)
+    is_fold = test.get("fold_only", False)
     
     reset_log()
+    if DEBUG_LOG:
+        # a cached derivative skips its rewrite steps, which would leave this
+        # test's log incomplete; otherwise tests share derivatives
+        clear_diff_cache()
     
     if is_integrate:
         result = integrate(expr, "x")
         test_type = "Integration"
+    elif is_fold:
+        result = evaluate_constants(expr)
+        test_type = "Constant Folding"
     else:
         # Assuming all non-integration tests are differentiation
         result = differentiate(expr, "x")
         test_type = "Differentiation"
     
     # This call now only populates the lists, without printing
-    passed = check_equal(result, expected_expr)
+    passed = check_equal(result, expected_expr, test["expected_simplified"])
     print_result(name, passed, repr(expected_expr), repr(result), test_type)
 
 
 if __name__ == "__main__":
     # The header remains, but the individual results list is suppressed below this line
     print(f"\nRunning calculus tests...\n{'=' * 60}\n")
+    if DEBUG_LOG:
+        enable_log()
     
     # Run all tests (silently)
     for test in TESTS:
@@ -87,6 +105,7 @@ if __name__ == "__main__":
             print(f"   Expected: {YELLOW}{failure['expected']}{RESET}")
             print(f"   Got:      {YELLOW}{failure['got']}{RESET}")
     
-    print(f"\nTotal rewrite steps logged: {get_step_counter()}")
-    print(f"Log written to: {LOG_FILE}")
+    if DEBUG_LOG:
+        print(f"\nTotal rewrite steps logged: {get_step_counter()}")
+        print(f"Log written to: {LOG_FILE}")
     print("\nAll tests completed.")
\ No newline at end of file
@@ -2,222 +2,365 @@
 # (Core symbolic classes and a facade for the engine functions)
 
 from dataclasses import dataclass
+from functools import partial
+import weakref
 from typing import Any, Dict, List, Tuple, Optional
 import os # Keep os for compatibility with original imports
 from logger import log_step, reset_log, get_step_counter, LOG_FILE # Keep logger imports
 
 # ============================================================
-# Expression Classes
+# Node Interning (hash-consing)
 # ============================================================
+# Every node is built through _Interned.__call__, which returns the existing
+# node when one with the same class and the same fields already exists.
+# Children are interned too, so they are keyed by identity, and structurally
+# identical trees are the very same object. Atom values are keyed by
+# (type, value) so 1 and 1.0 stay distinct (they print differently); floats
+# use their hex form so -0.0 and 0.0 do not collapse into one node.
+#
+# The pool holds nodes weakly: an intermediate tree nobody references any
+# more is freed (and its entry dropped) instead of living for the rest of
+# the process. A node's key holds its children's ids, which stay valid
+# because the node keeps its children alive.
+
+_NODE_POOL: Dict[tuple, "weakref.ref"] = {}
+
+def _forget(key: tuple, ref: "weakref.ref") -> None:
+    # weakref callback; the key may already map to a newer node
+    if _NODE_POOL.get(key) is ref:
+        del _NODE_POOL[key]
+
+# Expr equality is identity (see Expr.__eq__). Set to True, e.g. while
+# debugging, to compare nodes field by field instead.
+STRICT_STRUCTURAL_EQ = False
+
+def _field_key(value) -> Any:
+    if isinstance(value, Expr): return id(value)
+    if type(value) is float: return (float, value.hex())
+    return (type(value), value)
+
+class _Interned(type):
+    def __call__(cls, *args, **kwargs):
+        if kwargs:
+            names = list(getattr(cls, "__dataclass_fields__", {}))[len(args):]
+            args += tuple(kwargs.pop(name) for name in names if name in kwargs)
+            if kwargs: return super().__call__(*args, **kwargs)
+        key = (cls,) + tuple(_field_key(a) for a in args)
+        try:
+            ref = _NODE_POOL.get(key)
+        except TypeError:
+            # unhashable payload (e.g. a list): build it, just without interning
+            return super().__call__(*args)
+        if ref is not None:
+            node = ref()
+            if node is not None:
+                return node
+        node = super().__call__(*args)
+        _NODE_POOL[key] = weakref.ref(node, partial(_forget, key))
+        return node
 
-class Expr:
-    def children(self): return []
-    def __repr__(self): raise NotImplementedError
-    def __eq__(self, other): return isinstance(other, Expr) and repr(self) == repr(other)
+# ============================================================
+# Expression Classes
+# ============================================================
 
-@dataclass
+class Expr(metaclass=_Interned):
+    # Nodes are frozen, slotted dataclasses declared with eq=False, so they
+    # keep the identity __eq__ and cached __hash__ below rather than the
+    # generated field-walking ones. These slots are lazily filled
+    # caches: the printed form, the names of the variables in the subtree,
+    # the structural hash, and the node-type signature.
+    __slots__ = ("_repr", "_free_vars", "_hash", "_sig", "__weakref__")
+    _type_bit = 0  # this class's bit in sig, assigned below
+
+    def children(self): return ()
+    @property
+    def sig(self) -> int:
+        """Bitmask of the node types occurring anywhere in the subtree."""
+        try:
+            return self._sig
+        except AttributeError:
+            sig = type(self)._type_bit
+            for child in self.children():
+                sig |= child.sig
+            object.__setattr__(self, "_sig", sig)
+            return sig
+    @property
+    def free_vars(self) -> frozenset:
+        try:
+            return self._free_vars
+        except AttributeError:
+            fv = frozenset().union(*(child.free_vars for child in self.children()))
+            object.__setattr__(self, "_free_vars", fv)
+            return fv
+    def _build_repr(self): raise NotImplementedError
+    def __repr__(self):
+        try:
+            return self._repr
+        except AttributeError:
+            r = self._build_repr()
+            object.__setattr__(self, "_repr", r)
+            return r
+    def __eq__(self, other):
+        # Interned nodes are equal exactly when they are the same object, up
+        # to 1 vs 1.0 style atom differences (and nodes with unhashable
+        # payloads, which are not interned); STRICT_STRUCTURAL_EQ compares
+        # those fields as well.
+        if self is other: return True
+        if not STRICT_STRUCTURAL_EQ: return False
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__dataclass_fields__)
+    def __hash__(self):
+        # hash of (type, fields), computed once; children answer from their own cache
+        try:
+            return self._hash
+        except AttributeError:
+            h = hash((type(self),) + tuple(getattr(self, name) for name in self.__dataclass_fields__))
+            object.__setattr__(self, "_hash", h)
+            return h
+
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Const(Expr):
     value: Any
-    def __repr__(self): return str(self.value)
+    @property
+    def sig(self) -> int:
+        # Const(?c) in a pattern or template also counts as a PatternVar
+        return Const._type_bit | (self.value.sig if isinstance(self.value, PatternVar) else 0)
+    def _build_repr(self): return str(self.value)
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Var(Expr):
     name: Any
-    def __repr__(self): return str(self.name)
-
-@dataclass
+    @property
+    def free_vars(self) -> frozenset:
+        # A Var named by a PatternVar is a pattern, not a variable occurrence
+        return frozenset((self.name,)) if isinstance(self.name, str) else frozenset()
+    @property
+    def sig(self) -> int:
+        # likewise Var(?x)
+        return Var._type_bit | (self.name.sig if isinstance(self.name, PatternVar) else 0)
+    def _build_repr(self): return str(self.name)
+
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Add(Expr):
     left: Expr; right: Expr
-    def children(self): return [self.left, self.right]
-    def __repr__(self): return f"({self.left}+{self.right})"
+    def children(self): return (self.left, self.right)
+    def _build_repr(self): return f"({self.left}+{self.right})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Sub(Expr):
     left: Expr; right: Expr
-    def children(self): return [self.left, self.right]
-    def __repr__(self): return f"({self.left}-{self.right})"
+    def children(self): return (self.left, self.right)
+    def _build_repr(self): return f"({self.left}-{self.right})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Mul(Expr):
     left: Expr; right: Expr
-    def children(self): return [self.left, self.right]
-    def __repr__(self): return f"({self.left}*{self.right})"
+    def children(self): return (self.left, self.right)
+    def _build_repr(self): return f"({self.left}*{self.right})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Div(Expr):
     left: Expr; right: Expr
-    def children(self): return [self.left, self.right]
-    def __repr__(self): return f"({self.left}/{self.right})"
+    def children(self): return (self.left, self.right)
+    def _build_repr(self): return f"({self.left}/{self.right})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Pow(Expr):
     base: Expr; exp: Expr
-    def children(self): return [self.base, self.exp]
-    def __repr__(self): return f"({self.base}^{self.exp})"
+    def children(self): return (self.base, self.exp)
+    def _build_repr(self): return f"({self.base}^{self.exp})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Exp(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"exp({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"exp({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Log(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"log({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"log({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Sin(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"sin({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"sin({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Cos(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"cos({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"cos({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Tan(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"tan({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"tan({self.arg})"
 
 # --- Inverse Trig ---
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class ArcSin(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"arcsin({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"arcsin({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class ArcCos(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"arccos({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"arccos({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class ArcTan(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"arctan({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"arctan({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class ArcCsc(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"arccsc({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"arccsc({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class ArcSec(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"arcsec({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"arcsec({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class ArcCot(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"arccot({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"arccot({self.arg})"
 
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Sqrt(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"sqrt({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"sqrt({self.arg})"
 
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Differentiate(Expr):
     expr: Expr; var: Var
-    def children(self): return [self.expr, self.var]
-    def __repr__(self): return f"d/d{self.var}({self.expr})"
+    def children(self): return (self.expr, self.var)
+    def _build_repr(self): return f"d/d{self.var}({self.expr})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Integrate(Expr):
     expr: Expr; var: Var
-    def children(self): return [self.expr, self.var]
-    def __repr__(self): return f"∫d{self.var}({self.expr})"
+    def children(self): return (self.expr, self.var)
+    def _build_repr(self): return f"∫d{self.var}({self.expr})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class PatternVar(Expr):
     name: str
-    def __repr__(self): return f"?{self.name}"
+    def _build_repr(self): return f"?{self.name}"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Neg(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"(-{self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"(-{self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Sec(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"sec({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"sec({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Csc(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"csc({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"csc({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Cot(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"cot({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"cot({self.arg})"
 
 # --- Hyperbolic Functions ---
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Sinh(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"sinh({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"sinh({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Cosh(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"cosh({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"cosh({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Tanh(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"tanh({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"tanh({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Coth(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"coth({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"coth({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Sech(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"sech({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"sech({self.arg})"
 
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Csch(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"csch({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"csch({self.arg})"
     
 # --- Absolute Value ---
-@dataclass
+@dataclass(repr=False, eq=False, frozen=True, slots=True)
 class Abs(Expr):
     arg: Expr
-    def children(self): return [self.arg]
-    def __repr__(self): return f"abs({self.arg})"
+    def children(self): return (self.arg,)
+    def _build_repr(self): return f"abs({self.arg})"
+
+# Each node class gets its own bit for Expr.sig. slots=True replaces every
+# class with a new one, so only the classes actually bound here are counted
+# (keeping sig within a machine word).
+_NODE_CLASSES = [c for c in Expr.__subclasses__() if globals().get(c.__name__) is c]
+for _bit, _cls in enumerate(_NODE_CLASSES):
+    _cls._type_bit = 1 << _bit
+
+# ============================================================
+# Shared Small Constants
+# ============================================================
+# Const(0), Const(1), ... are built over and over by the rule sets, the
+# integration driver and constant folding. Nodes are interned, so Const(v)
+# already returns the shared node; C(v) also skips the pool lookup for
+# small ints, like CPython's small-int cache.
+
+_SMALL_CONSTS: Dict[int, "Const"] = {i: Const(i) for i in range(-16, 17)}
+
+def C(value) -> Const:
+    if type(value) is int:
+        node = _SMALL_CONSTS.get(value)
+        if node is not None:
+            return node
+    return Const(value)
+
+# The two constants the algebraic identities hinge on. Any int Const(0) or
+# Const(1) is this very node, so `node is ZERO` is a complete test for them.
+ZERO, ONE = _SMALL_CONSTS[0], _SMALL_CONSTS[1]
 
 # ============================================================
 # FACADE / PUBLIC API
 # Import and re-export the engine functions to maintain compatibility.
 # All existing files will still be able to "from rules import rewrite"
 # ============================================================
-from engine import match, substitute, rewrite, evaluate_constants
\ No newline at end of file
+from engine import Rule, make_rule, make_rules, match, substitute, rewrite, rewrite_at, rewrite_fixpoint, evaluate_constants
\ No newline at end of file
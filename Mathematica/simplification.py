@@ -1,11 +1,13 @@
 from rules import *
-import math
+from functools import lru_cache
 
 # ============================================================
 # Simplification Rules
 # ============================================================
-def simplification_rules() -> List[Tuple[Expr, Expr]]:
-    return [
+@lru_cache(maxsize=1)
+def simplification_rules() -> Tuple[Rule, ...]:
+    """Built once and shared; the tuple keeps callers from mutating it."""
+    return make_rules((
         # ---------- Algebraic base identities ----------
         (Add(PatternVar("x"), Const(0)), PatternVar("x")),
         (Add(Const(0), PatternVar("x")), PatternVar("x")),
@@ -36,8 +38,7 @@ def simplification_rules() -> List[Tuple[Expr, Expr]]:
 
         # ---------- Log/Exp identities ----------
         (Exp(Log(PatternVar("x"))), PatternVar("x")),
-        (Log(Const(math.e)), Const(1)),
-        (Log(Const(2.71828)), Const(1)),
+        # log(e) -> 1 is folded by evaluate_constants
 
         # ---------- Power/Reciprocal identities ----------
         (Div(Const(1), Pow(PatternVar("x"), PatternVar("n"))),
@@ -72,7 +73,6 @@ def simplification_rules() -> List[Tuple[Expr, Expr]]:
          Mul(Div(Const(1), Cos(PatternVar("u"))), Tan(PatternVar("u")))),
         (Exp(Log(PatternVar("x"))), PatternVar("x")),
         (Log(Exp(PatternVar("x"))), PatternVar("x")),
-        (Log(Const(math.e)), Const(1)),
         (Div(Const(1), Pow(PatternVar("x"), PatternVar("n"))),
          Pow(PatternVar("x"), Neg(PatternVar("n")))),
         (Pow(PatternVar("x"), Const(-1)), Div(Const(1), PatternVar("x"))),
@@ -96,4 +96,18 @@ def simplification_rules() -> List[Tuple[Expr, Expr]]:
         # ((y/x)*(-1))/y  →  -1/x  (just in case Neg collapsed differently)
         (Div(Mul(Div(PatternVar("y"), PatternVar("x")), Const(-1)), PatternVar("y")),
          Neg(Div(Const(1), PatternVar("x")))),
-    ]
+    ))
+
+@lru_cache(maxsize=1)
+def multiplicative_rules() -> Tuple[Rule, ...]:
+    """
+    The arithmetic part of simplification_rules() (rules rooted at Add, Sub,
+    Mul, Div, Pow or Neg), in the same order. Enough to tidy products such
+    as the v*du term of integration by parts.
+    """
+    heads = (Add, Sub, Mul, Div, Pow, Neg)
+    return tuple(rule for rule in simplification_rules() if rule.head in heads)
+
+def simplify_all(expr: Expr) -> Expr:
+    """Simplification rules and constant folding, fused into one fix-point loop."""
+    return rewrite_fixpoint(expr, simplification_rules())
@@ -200,6 +200,12 @@ INTEGRATION_TESTS = [
         "expected": Log(Add(Pow(x, Const(2)), Const(1))),
         "integrate_only": True,
     },
+    {
+        "name": "Integration Test (exp(0*x) = 1)",
+        "expr": Exp(Mul(Const(0), x)),
+        "expected": x,
+        "integrate_only": True,
+    },
     {
         "name": "Integration Test (IBP: x*e^x)",
         "expr": Mul(x, Exp(x)),
@@ -208,8 +214,53 @@ INTEGRATION_TESTS = [
     },
 ]
 
+# ============================================================
+# CONSTANT FOLDING TESTS
+# ============================================================
+# Results too large to be worth computing, x/0 and float overflow are
+# left unfolded; ordinary constant arithmetic still folds.
+
+CONSTANT_FOLDING_TESTS = [
+    {
+        "name": "Constant Folding (2^10)",
+        "expr": Pow(Const(2), Const(10)),
+        "expected": Const(1024),
+        "fold_only": True,
+    },
+    {
+        "name": "Constant Folding (10^(10^6) left unfolded)",
+        "expr": Pow(Const(10), Const(10**6)),
+        "expected": Pow(Const(10), Const(10**6)),
+        "fold_only": True,
+    },
+    {
+        "name": "Constant Folding (3^647, 1026 bits, left unfolded)",
+        "expr": Pow(Const(3), Const(647)),
+        "expected": Pow(Const(3), Const(647)),
+        "fold_only": True,
+    },
+    {
+        "name": "Constant Folding (2^600 * 2^600 left unfolded)",
+        "expr": Mul(Const(2**600), Const(2**600)),
+        "expected": Mul(Const(2**600), Const(2**600)),
+        "fold_only": True,
+    },
+    {
+        "name": "Constant Folding (1/0 left unfolded)",
+        "expr": Div(Const(1), Const(0)),
+        "expected": Div(Const(1), Const(0)),
+        "fold_only": True,
+    },
+    {
+        "name": "Constant Folding (10.0^400 overflow left unfolded)",
+        "expr": Pow(Const(10.0), Const(400)),
+        "expected": Pow(Const(10.0), Const(400)),
+        "fold_only": True,
+    },
+]
+
 # ============================================================
 # FINAL TESTS OBJECT
 # ============================================================
 
-TESTS = DIFFERENTIATION_TESTS + INTEGRATION_TESTS
+TESTS = DIFFERENTIATION_TESTS + INTEGRATION_TESTS + CONSTANT_FOLDING_TESTS
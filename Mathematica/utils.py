@@ -4,22 +4,6 @@ from rules import Expr, Var, Const, Add, Mul, Div, Pow, Log, Exp, Sin, Cos, Tan,
 
 def is_independent_of(expr: Expr, var: Var) -> bool:
     """Returns True if the expression does NOT contain the variable 'var'."""
-    # Base Case 1: The variable is found.
-    if isinstance(expr, Var) and expr.name == var.name:
-        return False
-    
-    # Base Case 2: Terminal node (Const, Var that is not 'var')
-    if isinstance(expr, (Const, Var)):
-        return True
-    
-    # Base Case 3: Check Integral variables (if used)
-    if isinstance(expr, Integrate) and expr.var.name == var.name:
-        return False
-
-    # Recursive Case: Check all children.
-    # This assumes all expression classes in rules.py have a working children() method.
-    for child in expr.children():
-        if not is_independent_of(child, var):
-            return False
-            
-    return True # If the loop finishes without finding 'var', it's independent.
\ No newline at end of file
+    # free_vars is cached per node and includes the variable of an Integrate,
+    # so an integral over 'var' still counts as depending on it.
+    return var.name not in expr.free_vars
@@ -4,14 +4,21 @@
 from .expr import *
 from .rules import Rule, register_rule
 
+
+def _is_const(expr, const: Const) -> bool:
+    # Identity settles the interned int constants; the value compare still
+    # accepts e.g. 0.0 for ZERO.
+    return expr is const or (type(expr) is Const and expr.value == const.value)
+
 # ------------------------------------------------------------
 # Axioms implemented as rewrite transformations
 # ------------------------------------------------------------
 
 def axiom_add_comm(expr):
     # u + v → v + u (Only if str(u) > str(v) to enforce canonical order)
-    if isinstance(expr, Add):
+    if type(expr) is Add:
         # FIX: Enforce canonical order to prevent infinite loops
+        # (each node keeps its own string, so str() is built once per node)
         if str(expr.left) > str(expr.right):
             # Transform to v + u
             return Add(expr.right, expr.left)
@@ -20,14 +27,14 @@ def axiom_add_comm(expr):
 
 def axiom_add_assoc(expr):
     # (u + v) + w → u + (v + w)
-    if isinstance(expr, Add) and isinstance(expr.left, Add):
+    if type(expr) is Add and type(expr.left) is Add:
         return Add(expr.left.left, Add(expr.left.right, expr.right))
     return None
 
 
 def axiom_add_id(expr):
     # u + 0 → u
-    if isinstance(expr, Add) and isinstance(expr.right, Const) and expr.right.value == 0:
+    if type(expr) is Add and _is_const(expr.right, ZERO):
         return expr.left
     return None
 
@@ -35,16 +42,16 @@ def axiom_add_id(expr):
 def axiom_add_inv(expr):
     # u + (-u) → 0
     # FIX: Must check for ScalarMul, not Mul, based on expr.py definitions
-    if isinstance(expr, Add) and isinstance(expr.right, ScalarMul):
-        if isinstance(expr.right.scalar, Const) and expr.right.scalar.value == -1:
-            if str(expr.left) == str(expr.right.vector):
-                return Const(0)
+    if type(expr) is Add and type(expr.right) is ScalarMul:
+        if _is_const(expr.right.scalar, NEG_ONE):
+            if expr.left is expr.right.vector:
+                return ZERO
     return None
 
 
 def axiom_scalar_distrib_vector(expr):
     # a · (u + v) → a · u + a · v
-    if isinstance(expr, ScalarMul) and isinstance(expr.vector, Add):
+    if type(expr) is ScalarMul and type(expr.vector) is Add:
         return Add(ScalarMul(expr.scalar, expr.vector.left),
                    ScalarMul(expr.scalar, expr.vector.right))
     return None
@@ -52,7 +59,7 @@ def axiom_scalar_distrib_vector(expr):
 
 def axiom_scalar_distrib_scalar(expr):
     # (a + b) · u → a · u + b · u
-    if isinstance(expr, ScalarMul) and isinstance(expr.scalar, Add):
+    if type(expr) is ScalarMul and type(expr.scalar) is Add:
         return Add(ScalarMul(expr.scalar.left, expr.vector),
                    ScalarMul(expr.scalar.right, expr.vector))
     return None
@@ -61,7 +68,7 @@ def axiom_scalar_distrib_scalar(expr):
 def axiom_scalar_assoc(expr):
     # a · (b · u) → (a·b) · u
     # This rule is the focus of Test 6.
-    if isinstance(expr, ScalarMul) and isinstance(expr.vector, ScalarMul):
+    if type(expr) is ScalarMul and type(expr.vector) is ScalarMul:
         # Step 1: Group the scalars (a·b)
         new_scalar = Mul(expr.scalar, expr.vector.scalar)
         new_vector = expr.vector.vector
@@ -72,15 +79,15 @@ def axiom_scalar_assoc(expr):
 
 def axiom_scalar_id(expr):
     # 1 · u → u
-    if isinstance(expr, ScalarMul) and isinstance(expr.scalar, Const) and expr.scalar.value == 1:
+    if type(expr) is ScalarMul and _is_const(expr.scalar, ONE):
         return expr.vector
     return None
 
 
 def axiom_zero_mul(expr):
     # 0 · u → 0
-    if isinstance(expr, ScalarMul) and isinstance(expr.scalar, Const) and expr.scalar.value == 0:
-        return Const(0)
+    if type(expr) is ScalarMul and _is_const(expr.scalar, ZERO):
+        return ZERO
     return None
 
 
@@ -88,13 +95,13 @@ def axiom_zero_mul(expr):
 
 def axiom_factor_scalar(expr):
     # a · u + b · u → (a + b) · u
-    if isinstance(expr, Add):
+    if type(expr) is Add:
         left = expr.left
         right = expr.right
         
         # Check if left is a · u and right is b · u
-        if isinstance(left, ScalarMul) and isinstance(right, ScalarMul):
-            if str(left.vector) == str(right.vector):
+        if type(left) is ScalarMul and type(right) is ScalarMul:
+            if left.vector is right.vector:
                 # Found a·u + b·u
                 new_scalar = Add(left.scalar, right.scalar)
                 return ScalarMul(new_scalar, left.vector)
@@ -103,11 +110,11 @@ def axiom_factor_scalar(expr):
 def axiom_scalar_arith(expr):
     # Perform simple constant arithmetic: a + b -> c or a * b -> c
     # CRITICAL: This is the rule that turns (-1 \cdot -1) into 1.
-    if isinstance(expr, Add):
-        if isinstance(expr.left, Const) and isinstance(expr.right, Const):
+    if type(expr) is Add:
+        if type(expr.left) is Const and type(expr.right) is Const:
             return Const(expr.left.value + expr.right.value)
-    if isinstance(expr, Mul):
-        if isinstance(expr.left, Const) and isinstance(expr.right, Const):
+    if type(expr) is Mul:
+        if type(expr.left) is Const and type(expr.right) is Const:
             return Const(expr.left.value * expr.right.value)
     return None
 
@@ -118,22 +125,22 @@ def axiom_scalar_arith(expr):
 
 # 0. Scalar Arithmetic (Highest Priority - Simplify constants immediately)
 # This MUST run before VS_Scalar_Id, and often immediately after VS_Scalar_Assoc
-register_rule(Rule("Scalar_Arith", "Perform scalar constant arithmetic (e.g., a+b or a*b)", axiom_scalar_arith))
+register_rule(Rule("Scalar_Arith", "Perform scalar constant arithmetic (e.g., a+b or a*b)", axiom_scalar_arith, (Add, Mul)))
 
 # 1. Elimination/Identity Rules (Remove terms)
-register_rule(Rule("VS_Zero_Mul", "Multiplication by zero scalar or zero vector is zero", axiom_zero_mul))
-register_rule(Rule("VS_Scalar_Id", "Scalar multiplication identity (1 · u -> u)", axiom_scalar_id))
-register_rule(Rule("VS_Add_Inv", "Additive inverse (u + (-1)u -> 0)", axiom_add_inv))
-register_rule(Rule("VS_Add_Id", "Additive identity (u + 0 -> u)", axiom_add_id))
-register_rule(Rule("VS_Factor_Scalar", "Distributivity: a·u + b·u -> (a+b)·u", axiom_factor_scalar))
+register_rule(Rule("VS_Zero_Mul", "Multiplication by zero scalar or zero vector is zero", axiom_zero_mul, (ScalarMul,)))
+register_rule(Rule("VS_Scalar_Id", "Scalar multiplication identity (1 · u -> u)", axiom_scalar_id, (ScalarMul,)))
+register_rule(Rule("VS_Add_Inv", "Additive inverse (u + (-1)u -> 0)", axiom_add_inv, (Add,)))
+register_rule(Rule("VS_Add_Id", "Additive identity (u + 0 -> u)", axiom_add_id, (Add,)))
+register_rule(Rule("VS_Factor_Scalar", "Distributivity: a·u + b·u -> (a+b)·u", axiom_factor_scalar, (Add,)))
 
 # 2. Structural Expansion Rules
-register_rule(Rule("VS_Distrib_Vector", "Scalar multiplication distributes over vector addition", axiom_scalar_distrib_vector))
-register_rule(Rule("VS_Distrib_Scalar", "Scalar multiplication distributes over scalar addition", axiom_scalar_distrib_scalar))
+register_rule(Rule("VS_Distrib_Vector", "Scalar multiplication distributes over vector addition", axiom_scalar_distrib_vector, (ScalarMul,)))
+register_rule(Rule("VS_Distrib_Scalar", "Scalar multiplication distributes over scalar addition", axiom_scalar_distrib_scalar, (ScalarMul,)))
 # VS_Scalar_Assoc must be here to fire when the simplify loop recurses
-register_rule(Rule("VS_Scalar_Assoc", "Scalar multiplication associative", axiom_scalar_assoc))
+register_rule(Rule("VS_Scalar_Assoc", "Scalar multiplication associative", axiom_scalar_assoc, (ScalarMul,)))
 
 
 # 3. Canonicalization Rules (Lowest Priority - Must not cause loops with higher priority rules)
-register_rule(Rule("VS_Add_Assoc", "Addition is associative (enforcing right-deep)", axiom_add_assoc))
-register_rule(Rule("VS_Add_Comm", "Addition is commutative (canonicalized)", axiom_add_comm))
\ No newline at end of file
+register_rule(Rule("VS_Add_Assoc", "Addition is associative (enforcing right-deep)", axiom_add_assoc, (Add,)))
+register_rule(Rule("VS_Add_Comm", "Addition is commutative (canonicalized)", axiom_add_comm, (Add,)))
\ No newline at end of file
@@ -6,13 +6,82 @@
 # a .to_latex() method for exporting to readable LaTeX.
 # ------------------------------------------------------------
 
-from dataclasses import dataclass
-from typing import Any
+from dataclasses import dataclass, fields
+from functools import partial
+from typing import Any, Dict, Tuple
+import weakref
+
+
+# ---------- Node Interning (hash-consing) ----------
+# Every node is built through _Interned.__call__, which returns the existing
+# node when one with the same class and the same fields already exists.
+# Children are interned too, so they are keyed by identity, and structurally
+# identical trees are the very same object: the axioms test "same subtree"
+# with `is`. Atom values are keyed by (type, value) so 1 and 1.0 stay
+# distinct (they print differently).
+#
+# The pool holds nodes weakly, so trees dropped by the rewriter are freed.
+# A node's key holds its children's ids, which stay valid because the node
+# keeps its children alive.
+
+_NODE_POOL: Dict[tuple, "weakref.ref"] = {}
+
+def _forget(key: tuple, ref: "weakref.ref") -> None:
+    # weakref callback; the key may already map to a newer node
+    if _NODE_POOL.get(key) is ref:
+        del _NODE_POOL[key]
+
+def _field_key(value) -> Any:
+    if isinstance(value, Expr): return id(value)
+    if type(value) is float: return (float, value.hex())
+    return (type(value), value)
+
+class _Interned(type):
+    def __call__(cls, *args, **kwargs):
+        if kwargs:
+            # the kernel rebuilds nodes by field name
+            names = list(getattr(cls, "__dataclass_fields__", {}))[len(args):]
+            args += tuple(kwargs.pop(name) for name in names if name in kwargs)
+            if kwargs: return super().__call__(*args, **kwargs)
+        key = (cls,) + tuple(_field_key(a) for a in args)
+        try:
+            ref = _NODE_POOL.get(key)
+        except TypeError:
+            # unhashable payload: build it, just without interning
+            return super().__call__(*args)
+        if ref is not None:
+            node = ref()
+            if node is not None:
+                return node
+        node = super().__call__(*args)
+        _NODE_POOL[key] = weakref.ref(node, partial(_forget, key))
+        return node
+
+
+class Expr(metaclass=_Interned):
+    """Base class for all symbolic expressions.
+
+    Nodes are interned and frozen; equality and hashing are by identity.
+    """
+    __slots__ = ("__weakref__", "_latex")  # subclasses are slotted dataclasses
+    _child_fields: Tuple[str, ...] = ()  # names of the Expr-typed fields, set below
 
-
-class Expr:
-    """Base class for all symbolic expressions."""
     def to_latex(self) -> str:
+        # Each node appends its pieces to one shared list, joined once at
+        # the end, instead of every level concatenating its children's
+        # strings into a new one. A node is immutable, so its string is
+        # built once and kept (str() is the same string).
+        try:
+            return self._latex
+        except AttributeError:
+            pass
+        buf = []
+        self._emit(buf)
+        latex = "".join(buf)
+        object.__setattr__(self, "_latex", latex)  # frozen dataclass
+        return latex
+
+    def _emit(self, buf: list) -> None:
         raise NotImplementedError
 
     def __str__(self):
@@ -21,67 +90,98 @@ class Expr:
 
 # ---------- Atomic Expressions ----------
 
-@dataclass
+@dataclass(eq=False, frozen=True, slots=True)
 class Const(Expr):
     value: Any
-    def to_latex(self):
-        return str(self.value)
+    def _emit(self, buf):
+        buf.append(str(self.value))
+
+
+# The constants the axioms test for and produce. Nodes are interned, so any
+# int Const(0), Const(1) or Const(-1) is one of these very nodes.
+ZERO, ONE, NEG_ONE = Const(0), Const(1), Const(-1)
 
 
-@dataclass
+@dataclass(eq=False, frozen=True, slots=True)
 class Var(Expr):
     name: str
-    def to_latex(self):
-        return self.name
+    def _emit(self, buf):
+        buf.append(str(self.name))
 
 
 # ---------- Composite Expressions ----------
 
-@dataclass
+@dataclass(eq=False, frozen=True, slots=True)
 class Add(Expr):
     left: Expr
     right: Expr
-    def to_latex(self):
-        return f"({self.left.to_latex()} + {self.right.to_latex()})"
+    def _emit(self, buf):
+        buf.append("(")
+        self.left._emit(buf)
+        buf.append(" + ")
+        self.right._emit(buf)
+        buf.append(")")
 
 
-@dataclass
+@dataclass(eq=False, frozen=True, slots=True)
 class Sub(Expr):
     left: Expr
     right: Expr
-    def to_latex(self):
-        return f"({self.left.to_latex()} - {self.right.to_latex()})"
+    def _emit(self, buf):
+        buf.append("(")
+        self.left._emit(buf)
+        buf.append(" - ")
+        self.right._emit(buf)
+        buf.append(")")
 
 
-@dataclass
+@dataclass(eq=False, frozen=True, slots=True)
 class Mul(Expr):
     left: Expr
     right: Expr
-    def to_latex(self):
+    def _emit(self, buf):
         # Use \cdot instead of literal dot so it works in math mode
-        return f"{self.left.to_latex()} \\cdot {self.right.to_latex()}"
+        self.left._emit(buf)
+        buf.append(" \\cdot ")
+        self.right._emit(buf)
 
 
-@dataclass
+@dataclass(eq=False, frozen=True, slots=True)
 class ScalarMul(Expr):
     scalar: Expr
     vector: Expr
-    def to_latex(self):
+    def _emit(self, buf):
         # Also use \cdot for proper LaTeX rendering
-        return f"{self.scalar.to_latex()} \\cdot {self.vector.to_latex()}"
+        self.scalar._emit(buf)
+        buf.append(" \\cdot ")
+        self.vector._emit(buf)
 
 
-@dataclass
+@dataclass(eq=False, frozen=True, slots=True)
 class Pow(Expr):
     base: Expr
     exponent: Expr
-    def to_latex(self):
-        return f"{self.base.to_latex()}^{{{self.exponent.to_latex()}}}"
+    def _emit(self, buf):
+        self.base._emit(buf)
+        buf.append("^{")
+        self.exponent._emit(buf)
+        buf.append("}")
 
 
-@dataclass
+@dataclass(eq=False, frozen=True, slots=True)
 class Eq(Expr):
     left: Expr
     right: Expr
-    def to_latex(self):
-        return f"{self.left.to_latex()} = {self.right.to_latex()}"
+    def _emit(self, buf):
+        self.left._emit(buf)
+        buf.append(" = ")
+        self.right._emit(buf)
+
+
+# ---------- Child Field Layout ----------
+# Traversals visit a node's children through this tuple of field names,
+# computed once per class, instead of inspecting the instance's fields.
+
+for _cls in (Const, Var, Add, Sub, Mul, ScalarMul, Pow, Eq):
+    _cls._child_fields = tuple(f.name for f in fields(_cls) if f.type is Expr)
+del _cls
@@ -1,24 +1,66 @@
 # ------------------------------------------------------------
 # LaTeX Export Utility
 # ------------------------------------------------------------
-import subprocess, shutil
+import os, stat, subprocess, shutil, tempfile, hashlib, getpass
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
 import time
 
-def write_and_compile_latex(tex_content: str, output_pdf: str = "proof.pdf"):
-    """Write LaTeX to file and compile it to a PDF (MiKTeX-aware)."""
+# Every proof document starts with this preamble.
+PREAMBLE = (
+    r"\documentclass[12pt]{article}" "\n"
+    r"\usepackage{amsmath}" "\n"
+    r"\usepackage{xcolor}" "\n"
+)
+
+def write_and_compile_latex(tex_content: str, output_pdf: str = "proof.pdf", draft: bool = False):
+    """
+    Write LaTeX to file and compile it to a PDF (MiKTeX-aware).
+    With draft=True pdflatex runs in -draftmode: the document is checked
+    but no PDF is written, which is much faster while debugging a proof.
+    """
+    _compile_one(tex_content, output_pdf, ".", _ensure_fmt(_find_pdflatex()), draft)
+
+
+def write_and_compile_many(jobs: Iterable[Tuple[str, str]], max_workers: Optional[int] = None,
+                           draft: bool = False) -> List[bool]:
+    """
+    Compile several (tex_content, output_pdf) documents in parallel, one
+    pdflatex process per document. Each job runs in its own temporary
+    directory so the .tex/.aux/.log files of different proofs cannot
+    collide; the PDFs end up in pdf_folder as with write_and_compile_latex.
+    Returns, per job, whether its PDF was produced (compiled cleanly, with draft).
+    """
+    jobs = list(jobs)
+    # Resolved (and built) once here and handed to the workers, which never
+    # try to build it themselves: they would race on the shared format dir.
+    fmt = _ensure_fmt(_find_pdflatex())
+    workdirs = [tempfile.mkdtemp(prefix="proof_") for _ in jobs]
+    try:
+        with ProcessPoolExecutor(max_workers) as pool:
+            return list(pool.map(_compile_one, [tex for tex, _ in jobs], [pdf for _, pdf in jobs], workdirs,
+                                 [fmt] * len(jobs), [draft] * len(jobs)))
+    finally:
+        for workdir in workdirs:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _compile_one(tex_content: str, output_pdf: str, workdir: str, fmt: Optional[str],
+                 draft: bool = False) -> bool:
+    """Compile one document in workdir; fmt is the preamble format from _ensure_fmt() or None."""
+    pdflatex_path = _find_pdflatex()
     start = time.time()
-    
+
     # --- FIX: Use a unique .tex file name based on the PDF name ---
-    temp_name = Path(output_pdf).with_suffix(".tex")
-    
+    temp_name = Path(workdir) / Path(output_pdf).with_suffix(".tex").name
+
     tex_file = temp_name # Use the unique name here
     # -----------------------------------------------------------------
 
+    # With the preloaded format the preamble is already in place
     full_doc = (
-        r"\documentclass[12pt]{article}" "\n"
-        r"\usepackage{amsmath}" "\n"
-        r"\usepackage{xcolor}" "\n"
+        ("" if fmt else PREAMBLE) +
         r"\begin{document}" "\n"
         + tex_content + "\n"
         r"\end{document}"
@@ -26,18 +68,27 @@ def write_and_compile_latex(tex_content: str, output_pdf: str = "proof.pdf"):
     tex_file.write_text(full_doc, encoding="utf-8")
     print(f"[LaTeX Write] Completed in {time.time() - start:.3f} s")
 
-    # --- find pdflatex executable ---
-    pdflatex_path = shutil.which("pdflatex")
-    if pdflatex_path is None:
-        # NOTE: Using the explicit path from your log as a fallback
-        pdflatex_path = r"C:\Users\forea\AppData\Local\Programs\MiKTeX\miktex\bin\x64\pdflatex.exe"
+    # --- reuse the PDF of an identical earlier document ---
+    cache_dir = None if draft else _private_dir("khwarizmi_pdf")
+    cached = cache_dir / (_pdf_cache_key(full_doc, fmt, pdflatex_path) + ".pdf") if cache_dir else None
+    if cached is not None and cached.exists():
+        shutil.copyfile(cached, Path("pdf_folder") / output_pdf)
+        os.utime(cached)  # recently used: pruned last
+        print(f"✅ PDF unchanged, reused: pdf_folder\\{output_pdf}")
+        return True
 
     print(f"Using LaTeX compiler: {pdflatex_path}")
 
     # --- compile ---
     start_compile = time.time()
+    args = [pdflatex_path, "-interaction=nonstopmode", tex_file.name] # Compile the unique .tex file
+    if fmt:
+        args.insert(1, f"-fmt={fmt}")
+    if draft:
+        args.insert(1, "-draftmode") # typeset only, no PDF shipped out
     result = subprocess.run(
-        [pdflatex_path, "-interaction=nonstopmode", tex_file.name], # Compile the unique .tex file
+        args,
+        cwd=workdir, # pdflatex writes its .aux/.log/.pdf next to the .tex
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
@@ -45,15 +96,144 @@ def write_and_compile_latex(tex_content: str, output_pdf: str = "proof.pdf"):
     compile_time = time.time() - start_compile
 
     # --- check success ---
+    if draft:
+        # no PDF to move; the exit status tells whether the document compiled
+        ok = result.returncode == 0
+        print(f"[LaTeX Draft] {'Compiled' if ok else 'Failed'} in {compile_time:.3f} s")
+        return ok
     pdf_path = tex_file.with_suffix(".pdf") # This will be the unique .pdf file
     if pdf_path.exists():
+        if cached is not None:
+            shutil.copyfile(pdf_path, cached)
+            _prune_pdf_cache(cache_dir)
         # Clean up the output by moving the unique PDF file to its final destination
-        pdf_path.replace(Path("pdf_folder") / output_pdf) # Assuming the final directory is pdf_folder as per your log
+        shutil.move(pdf_path, Path("pdf_folder") / output_pdf) # Assuming the final directory is pdf_folder as per your log
         print(f"✅ PDF generated and renamed: pdf_folder\\{output_pdf}")
         print(f"[LaTeX Compile] Completed in {compile_time:.3f} s")
+        return True
     else:
         print("⚠️  PDF compilation failed.\n--- STDOUT ---")
         print(result.stdout)
         print("--- STDERR ---")
         print(result.stderr)
-        print(f"[LaTeX Compile] Attempted in {compile_time:.3f} s")
\ No newline at end of file
+        print(f"[LaTeX Compile] Attempted in {compile_time:.3f} s")
+        return False
+
+
+def _find_pdflatex() -> str:
+    pdflatex_path = shutil.which("pdflatex")
+    if pdflatex_path is None:
+        # NOTE: Using the explicit path from your log as a fallback
+        pdflatex_path = r"C:\Users\forea\AppData\Local\Programs\MiKTeX\miktex\bin\x64\pdflatex.exe"
+    return pdflatex_path
+
+
+# Compiled PDFs by hash of their full source, so an unchanged proof is
+# copied instead of compiled again. The key also covers what the source is
+# compiled with: the format (whose name already encodes the compiler), or
+# the compiler itself when there is none, so a TeX upgrade recompiles.
+# Only the _PDF_CACHE_LIMIT most recently used PDFs are kept. The PDFs sit
+# in a private per-user directory (see _private_dir below); without one,
+# nothing is cached.
+_PDF_CACHE_LIMIT = 256
+
+def _pdf_cache_key(full_doc: str, fmt: Optional[str], pdflatex_path: str) -> str:
+    compiled_with = fmt if fmt else _compiler_id(pdflatex_path)
+    return hashlib.blake2b((compiled_with + "\0" + full_doc).encode("utf-8"), digest_size=16).hexdigest()
+
+def _prune_pdf_cache(cache_dir: Path) -> None:
+    try:
+        with os.scandir(cache_dir) as entries:
+            pdfs = [(e.stat().st_mtime, e.path) for e in entries if e.name.endswith(".pdf")]
+    except OSError:
+        return
+    if len(pdfs) <= _PDF_CACHE_LIMIT:
+        return
+    pdfs.sort()
+    for _, path in pdfs[:len(pdfs) - _PDF_CACHE_LIMIT]:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass  # already gone (another worker pruned it)
+
+
+# ------------------------------------------------------------
+# Private cache directories
+# ------------------------------------------------------------
+# The caches below live under the temp dir, which other local users can
+# write to. Each user gets their own directory (named after the uid),
+# created with mode 0700. Anything else found under that name (another
+# owner, a symlink, group/other access) is not trusted, and the cache is
+# simply not used. On Windows the temp dir is already per-user.
+
+def _private_dir(name: str) -> Optional[Path]:
+    """Per-user directory name-<uid> under the temp dir; None if it cannot be trusted."""
+    getuid = getattr(os, "getuid", None)
+    owner = str(getuid()) if getuid else getpass.getuser()
+    path = Path(tempfile.gettempdir()) / f"{name}-{owner}"
+    try:
+        path.mkdir(mode=0o700, exist_ok=True)
+        st = os.lstat(path)
+    except OSError:
+        return None
+    if not stat.S_ISDIR(st.st_mode):
+        return None
+    if getuid and (st.st_uid != getuid() or st.st_mode & 0o077):
+        return None
+    return path
+
+
+# ------------------------------------------------------------
+# Preloaded preamble format
+# ------------------------------------------------------------
+# Loading article, amsmath and xcolor is most of the work of compiling a
+# short proof. They are dumped once into a format file (pdflatex -ini) and
+# every document is compiled against it with -fmt. A format only loads in
+# the pdflatex build that dumped it, so the file name carries a hash of
+# PREAMBLE and of the compiler (path and --version banner): a changed
+# preamble or an upgraded TeX gets a new format. If the format cannot be
+# built, documents carry the preamble themselves as before.
+
+_fmt_failed = False
+_COMPILER_IDS: Dict[str, str] = {}
+
+def _compiler_id(pdflatex_path: str) -> str:
+    """Path and version banner of the compiler, read once per process."""
+    ident = _COMPILER_IDS.get(pdflatex_path)
+    if ident is None:
+        try:
+            banner = subprocess.run([pdflatex_path, "--version"], stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, text=True).stdout.partition("\n")[0]
+        except OSError:
+            banner = ""
+        ident = _COMPILER_IDS[pdflatex_path] = pdflatex_path + "\n" + banner
+    return ident
+
+def _ensure_fmt(pdflatex_path: str) -> Optional[str]:
+    """Path of the preamble format (without .fmt), building it if needed; None if unavailable."""
+    global _fmt_failed
+    key = PREAMBLE + "\0" + _compiler_id(pdflatex_path)
+    name = "proofkit-" + hashlib.md5(key.encode("utf-8")).hexdigest()[:8]
+    fmt_dir = _private_dir("khwarizmi_fmt")
+    if fmt_dir is None:
+        return None
+    fmt_file = fmt_dir / (name + ".fmt")
+    if fmt_file.exists():
+        return str(fmt_file.with_suffix(""))
+    if _fmt_failed:
+        return None
+    try:
+        (fmt_dir / (name + ".tex")).write_text(PREAMBLE + r"\dump" "\n", encoding="utf-8")
+        subprocess.run(
+            [pdflatex_path, "-ini", "-interaction=nonstopmode", f"-jobname={name}", "&pdflatex", name + ".tex"],
+            cwd=fmt_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+    except OSError:
+        pass
+    if fmt_file.exists():
+        return str(fmt_file.with_suffix(""))
+    _fmt_failed = True
+    return None
@@ -3,6 +3,12 @@
 # ------------------------------------------------------------
 from .proof_kernel import ProofStep
 
+# Characters that are special in LaTeX text, escaped in one pass
+_LATEX_ESCAPE = str.maketrans({"_": r"\_", "%": r"\%", "&": r"\&", "#": r"\#"})
+
+# One proof step line: label, before, after, escaped rule name
+_STEP_LINE = "({})\\;& {} = {} & \\quad\\textcolor{{gray}}{{[{}]}} \\\\"
+
 
 def export_latex(steps: list[ProofStep], goal: str = "1·(u+v)=u+v") -> str:
     """
@@ -31,7 +37,7 @@ def export_latex(steps: list[ProofStep], goal: str = "1·(u+v)=u+v") -> str:
 
     # ------------------- Header & Goal ------------------
     # The GOAL LINE that works for your environment:
-    safe_goal_expr = goal.replace("_", r"\_")
+    safe_goal_expr = goal.translate(_LATEX_ESCAPE)
     lines.append(r"\textbf{Goal:} Prove that $" + safe_goal_expr + r"$\\\\[1em]")
 
     # Start the alignment environment for the proof steps
@@ -46,11 +52,16 @@ def export_latex(steps: list[ProofStep], goal: str = "1·(u+v)=u+v") -> str:
     step_counter = 0 # Initialize at 0 so the first major step is (1)
     sub_counter = 0
     last_rule = None
+    escaped_rules = {}  # each distinct rule name is escaped once
 
-    for s in [s for s in steps if s.status == "ok"]:
+    for s in steps:
+        if s.status != "ok":
+            continue
         before = s.before.to_latex()
         after = s.after.to_latex()
-        rule = s.rule.replace("_", r"\_")
+        rule = escaped_rules.get(s.rule)
+        if rule is None:
+            rule = escaped_rules[s.rule] = s.rule.translate(_LATEX_ESCAPE)
         
         # Detect major rule change and add separator
         if s.rule != last_rule and step_counter > 0:
@@ -69,10 +80,7 @@ def export_latex(steps: list[ProofStep], goal: str = "1·(u+v)=u+v") -> str:
 
         # Normal step
         # Note: Using the rule name as justification
-        lines.append(
-            f"({label})\\;& {before} = {after} "
-            f"& \\quad\\textcolor{{gray}}{{[{rule}]}} \\\\"
-        )
+        lines.append(_STEP_LINE.format(label, before, after, rule))
 
     # ------------------- Conclusion -------------------
     if steps:
@@ -3,10 +3,10 @@
 # Proof Kernel — logs each rule application formally
 # ------------------------------------------------------------
 from dataclasses import dataclass
-from typing import List, Callable
+from typing import Dict, List, Callable, Tuple
 from .expr import Expr
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ProofStep:
     before: Expr
     after: Expr
@@ -17,65 +17,120 @@ class ProofStep:
 
 class ProofKernel:
     def __init__(self):
-        self.trace: List[ProofStep] = []
+        # Steps as plain (before, after, rule, justification, status) tuples;
+        # get_trace() turns them into ProofSteps when the trace is read.
+        self._raw: List[Tuple[Expr, Expr, str, str, str]] = []
+        self._steps: List[ProofStep] = []
+        # Per rule name, the subtrees in which that rule applies nowhere, by
+        # id (node kept alive). Nodes are interned and immutable, so such a
+        # subtree stays in normal form for the rule and the simplify passes
+        # that come after skip it instead of walking it again.
+        self._normal: Dict[str, Dict[int, Expr]] = {}
 
     def apply_rule(self, expr: Expr, rule_fn: Callable[[Expr], Expr],
-                   rule_name: str, justification: str) -> Expr:
+                   rule_name: str, justification: str,
+                   root_types: Tuple[type, ...] = ()) -> Tuple[Expr, bool]:
         """
         Try to apply a rule (recursively).
         - Priority 1: Apply rule at the current node (top-level). If successful, return immediately.
+          With root_types, the rule is only called on nodes of those exact types.
         - Priority 2: If top-level fails, try applying the rule recursively to children.
         - If a child changes, reconstruct the current node and log the change propagation step.
         - If no change occurs at any depth, returns the original expression without logging a failure.
         
-        Returns the (possibly) new expression.
+        Returns the (possibly) new expression and whether it changed.
         """
-        original_expr = expr
+        # Walked with an explicit stack instead of one Python call per node.
+        # A node is entered once: the rule is tried on it, and only if that
+        # fails is an exit entry for it pushed, with its children above it
+        # (leftmost on top). Finished subtrees are pushed on
+        # `results`; a node's exit pops its children's results from there,
+        # so steps are logged in the same order as the recursive walk.
+        # `failed` runs parallel to `results`: whether an error step was
+        # logged in that subtree. Such a subtree is never marked normal, so
+        # the next call tries the rule there again and logs the error again.
+        normal = self._normal.setdefault(rule_name, {})
+        results: List[Expr] = []
+        failed: List[bool] = []
+        stack = [(expr, False)]
 
-        try:
-            # 1. Try top-level application first
-            new_expr = rule_fn(expr)
-            if new_expr is not None and str(new_expr) != str(expr):
-                # Log the top-level change
-                step = ProofStep(expr, new_expr, rule_name, justification, "ok")
-                self.trace.append(step)
-                return new_expr  # SUCCESS: Return the new expression
+        while stack:
+            node, exiting = stack.pop()
 
-            # 2. If top-level failed, try recursion
-            if hasattr(expr, "__dict__"):
-                new_fields = {}
-                deep_change_occurred = False
-                
+            if exiting:
+                child_fields = node._child_fields
+                new_children = results[-len(child_fields):]
+                del results[-len(child_fields):]
+                child_failed = any(failed[-len(child_fields):])
+                del failed[-len(child_fields):]
                 # Check if any child expression changed after applying the rule
-                for k, v in expr.__dict__.items():
-                    if isinstance(v, Expr):
-                        # Recursive call: logs any deep changes and returns the new child expression
-                        new_v = self.apply_rule(v, rule_fn, rule_name, justification)
-                        
-                        if str(new_v) != str(v):
-                            deep_change_occurred = True
-                        new_fields[k] = new_v
-                    else:
-                        new_fields[k] = v
-                
-                if deep_change_occurred:
-                    # Construct the new parent expression from the modified children
-                    result_expr = expr.__class__(**new_fields)
-
+                if any(new_v is not getattr(node, k) for k, new_v in zip(child_fields, new_children)):
+                    try:
+                        # Construct the new parent expression from the modified children
+                        result_expr = node.__class__(**dict(zip(child_fields, new_children)))
+                    except Exception as e:
+                        # Hard error (like malformed structure) - Keep this for severe issues
+                        self._raw.append((node, node, rule_name,
+                                          f"Exception during rule: {e}", "error"))
+                        results.append(node)
+                        failed.append(True)
+                        continue
                     # Log the parent expression transformation.
-                    step = ProofStep(original_expr, result_expr, rule_name, f"Recursive application of {rule_name}", "ok")
-                    self.trace.append(step)
-                    return result_expr
-            
-            # 3. If nothing matched at any depth (top-level or recursive)
-            # CRITICAL FIX: DO NOT LOG failure steps here to prevent trace clutter.
-            return expr
+                    self._raw.append((node, result_expr, rule_name, f"Recursive application of {rule_name}", "ok"))
+                    results.append(result_expr)
+                else:
+                    # Nothing matched at any depth below: no failure step is logged.
+                    if not child_failed:
+                        normal[id(node)] = node
+                    results.append(node)
+                failed.append(child_failed)
+                continue
+
+            if id(node) in normal:
+                results.append(node)
+                failed.append(False)
+                continue
+
+            try:
+                # 1. Try top-level application first
+                new_expr = rule_fn(node) if not root_types or type(node) in root_types else None
+            except Exception as e:
+                # Hard error (like malformed structure) - Keep this for severe issues
+                self._raw.append((node, node, rule_name,
+                                  f"Exception during rule: {e}", "error"))
+                results.append(node)
+                failed.append(True)
+                continue
+
+            # Nodes are interned, so a changed tree is a different object
+            if new_expr is not None and new_expr is not node:
+                # Log the top-level change
+                self._raw.append((node, new_expr, rule_name, justification, "ok"))
+                results.append(new_expr)
+                failed.append(False)
+                continue
+
+            # 2. If top-level failed, try the children, then come back to the node
+            child_fields = node._child_fields
+            if not child_fields:
+                normal[id(node)] = node
+                results.append(node)
+                failed.append(False)
+                continue
+            stack.append((node, True))
+            for k in reversed(child_fields):
+                stack.append((getattr(node, k), False))
+
+        # Nodes are interned, so a changed tree is a different object
+        return results[0], results[0] is not expr
 
-        except Exception as e:
-            # Hard error (like malformed structure) - Keep this for severe issues
-            self.trace.append(ProofStep(expr, expr, rule_name,
-                                        f"Exception during rule: {e}", "error"))
-            return expr
+    def get_trace(self) -> List[ProofStep]:
+        # Only the steps logged since the last call are converted
+        steps = self._steps
+        if len(steps) < len(self._raw):
+            steps.extend(ProofStep(*raw) for raw in self._raw[len(steps):])
+        return steps
 
-    def get_trace(self):
-        return self.trace
\ No newline at end of file
+    @property
+    def trace(self) -> List[ProofStep]:
+        return self.get_trace()
\ No newline at end of file
@@ -2,7 +2,7 @@
 # Rewrite Rules and Registry
 # ------------------------------------------------------------
 from dataclasses import dataclass
-from typing import Callable, Dict, List, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from .expr import *
 
 # ------------------------------------------------------------
@@ -14,6 +14,9 @@ class Rule:
     name: str
     description: str
     apply: Callable[[Expr], Union[Expr, None]]
+    # Node types the rule can rewrite; empty means any. The kernel only
+    # calls apply() on nodes of these exact types.
+    root_types: Tuple[type, ...] = ()
 
 
 # ------------------------------------------------------------
@@ -21,10 +24,17 @@ class Rule:
 # ------------------------------------------------------------
 RULES: Dict[str, Rule] = {}
 
+# (name, apply, description, root_types) per registered rule, in
+# registration order. Built on first use and dropped by register_rule, so
+# simplify() reads it as is instead of looking every rule up again.
+_RULES_TUPLE: Optional[Tuple[Tuple[str, Callable, str, Tuple[type, ...]], ...]] = None
+
 
 def register_rule(rule: Rule):
     """Register a symbolic rewrite rule."""
+    global _RULES_TUPLE
     RULES[rule.name] = rule
+    _RULES_TUPLE = None
 
 
 def get_rule(name: str) -> Rule:
@@ -37,3 +47,12 @@ def get_rule(name: str) -> Rule:
 def list_rules() -> List[str]:
     """Return all registered rule names."""
     return list(RULES.keys())
+
+
+def rules_snapshot() -> Tuple[Tuple[str, Callable, str, Tuple[type, ...]], ...]:
+    """Return (name, apply, description, root_types) for every registered rule."""
+    global _RULES_TUPLE
+    if _RULES_TUPLE is None:
+        _RULES_TUPLE = tuple((r.name, r.apply, r.description, r.root_types)
+                             for r in RULES.values())
+    return _RULES_TUPLE
@@ -3,11 +3,18 @@
 # Simplification Strategy Layer
 # ------------------------------------------------------------
 
+import logging
+
 from .expr import Expr
-from .rules import list_rules, get_rule
+from .rules import rules_snapshot
 from .proof_kernel import ProofKernel
 from typing import Callable, Tuple
 
+# Iteration and rule-application trace. Debug level, so nothing is
+# formatted (not even str() of the tree) unless it is switched on, e.g.
+# logging.basicConfig(level=logging.DEBUG).
+log = logging.getLogger(__name__)
+
 def simplify(expr: Expr, kernel: ProofKernel) -> Tuple[Expr, bool]:
     """
     Applies all available rewrite rules iteratively until the expression 
@@ -18,8 +25,7 @@ def simplify(expr: Expr, kernel: ProofKernel) -> Tuple[Expr, bool]:
     Returns the simplified expression and a boolean indicating if any changes were made.
     """
     
-    rule_names = list_rules()
-    rules = [(get_rule(name).name, get_rule(name).apply, get_rule(name).description) for name in rule_names]
+    rules = rules_snapshot()
     
     current_expr = expr
     changed = True
@@ -29,25 +35,26 @@ def simplify(expr: Expr, kernel: ProofKernel) -> Tuple[Expr, bool]:
     while changed:
         iteration += 1
         changed = False
-        print(f"\n--- SIMPLIFY ITERATION {iteration}: {current_expr} ---") # DEBUG: Starting expression for the cycle
+        log.debug("--- SIMPLIFY ITERATION %d: %s ---", iteration, current_expr) # Starting expression for the cycle
         
         # Try every single rule on the current expression
-        for rule_name, rule_fn, rule_desc in rules:
+        for rule_name, rule_fn, rule_desc, root_types in rules:
             
             # Apply rule through the kernel; the kernel handles recursion (deep application)
-            new_expr = kernel.apply_rule(
+            new_expr, did_change = kernel.apply_rule(
                 current_expr, 
                 rule_fn, 
                 rule_name, 
-                rule_desc
+                rule_desc,
+                root_types
             )
             
-            # Check if the kernel actually changed the expression
-            if str(new_expr) != str(current_expr):
-                print(f"  [APPLIED] {rule_name}: {current_expr} -> {new_expr}") # DEBUG: Successful rule application
+            # The kernel reports whether it actually changed the expression
+            if did_change:
+                log.debug("  [APPLIED] %s: %s -> %s", rule_name, current_expr, new_expr) # Successful rule application
                 current_expr = new_expr
                 changed = True
                 # If a change occurred, restart the entire rule application loop 
                 break 
                 
-    return current_expr, str(current_expr) != str(expr)
\ No newline at end of file
+    return current_expr, current_expr is not expr
\ No newline at end of file
@@ -3,7 +3,6 @@
 # Symbolic System Entry Point
 # ------------------------------------------------------------
 import os
-import glob
 import shutil # Still needed for deleting subdirectories (if any)
 
 # Import the new test execution function
@@ -18,20 +17,21 @@ def cleanup_pdf_folder(folder_path="pdf_folder"):
     """
     print(f"\n--- Starting Pre-Test Cleanup: Emptying '{folder_path}' ---")
     
-    if os.path.exists(folder_path) and os.path.isdir(folder_path):
+    if os.path.isdir(folder_path):
         deleted_count = 0
-        # The pattern '*' matches all files and directories inside the folder
-        files_and_dirs = glob.glob(os.path.join(folder_path, '*'))
-        
-        for item in files_and_dirs:
-            try:
-                if os.path.isfile(item) or os.path.islink(item):
-                    os.remove(item)  # Delete files
-                elif os.path.isdir(item):
-                    shutil.rmtree(item)  # Recursively delete subdirectories
-                deleted_count += 1
-            except OSError as e:
-                print(f"❌ Error deleting {item}: {e}")
+        # One directory scan; the entry types come with it, no stat per item
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue  # hidden entries, as glob's '*' skipped them
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path)  # Recursively delete subdirectories
+                    else:
+                        os.unlink(entry.path)  # Delete files and links
+                    deleted_count += 1
+                except OSError as e:
+                    print(f"❌ Error deleting {entry.path}: {e}")
                 
         if deleted_count > 0:
             print(f"✅ Successfully removed {deleted_count} items from '{folder_path}'.")
@@ -53,17 +53,22 @@ def cleanup_temp_files():
     # ... (Rest of the cleanup_temp_files function remains the same)
     print("\n--- Starting Housekeeping: Removing temporary LaTeX files ---")
     
-    patterns = ['*.aux', '*.log', '*.tex']
+    suffixes = ('.aux', '.log', '.tex')
     deleted_count = 0
     
-    for pattern in patterns:
-        for file_path in glob.glob(pattern):
+    # A single scan of the directory for all three suffixes
+    with os.scandir('.') as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.name.endswith(suffixes):
+                continue
+            if not entry.is_file(follow_symlinks=False):
+                continue
             try:
-                os.remove(file_path)
-                # print(f"Deleted: {file_path}") # Optional: show every file deleted
+                os.unlink(entry.path)
+                # print(f"Deleted: {entry.path}") # Optional: show every file deleted
                 deleted_count += 1
             except OSError as e:
-                print(f"Error deleting {file_path}: {e}")
+                print(f"Error deleting {entry.path}: {e}")
                 
     if deleted_count > 0:
         print(f"✅ Cleanup complete. Total files removed: {deleted_count}.")
@@ -5,13 +5,18 @@
 from core.expr import *
 from core.proof_kernel import ProofKernel
 from core.logger import export_latex
-from core.latex_export import write_and_compile_latex
+from core.latex_export import write_and_compile_latex, write_and_compile_many
 from core.solver import simplify 
 
 # Ensure axioms are loaded (even if unused directly)
 import core.axioms_vector_space 
 
 
+# (tex, pdf_name) of the proofs still to compile while run_all_tests runs;
+# None compiles each proof as soon as its test has run.
+_PENDING_PDFS = None
+
+
 # --- Helper Function for Test Execution ---
 def run_test(test_num, name, start_expr, expected_result):
     print("\n" + "="*45)
@@ -32,7 +37,10 @@ def run_test(test_num, name, start_expr, expected_result):
     goal_str = f"{start_expr} = {expected_result}" 
     tex = export_latex(kernel.get_trace(), goal=goal_str)
     pdf_name = f"test_{test_num}_{name.lower().replace(' ', '_').replace(':', '')}.pdf"
-    write_and_compile_latex(tex, pdf_name)
+    if _PENDING_PDFS is not None:
+        _PENDING_PDFS.append((tex, pdf_name))
+    else:
+        write_and_compile_latex(tex, pdf_name)
 
     # Assertion
     assert str(final_expr) == expected_result, f"Test {test_num} Failed: Expected {expected_result}, Got {final_expr}"
@@ -110,12 +118,21 @@ def run_test_inverse_of_inverse():
 
 
 def run_all_tests():
-    run_test_scalar_identity()
-    run_test_scalar_associativity()
-    run_test_complex_inverse()
-    run_test_additive_inverse()
-    run_test_zero_scalar_mul()  # NEW
-    run_test_inverse_of_inverse() # NEW
+    # The proofs are compiled together at the end, in parallel, instead of
+    # paying one pdflatex start-up after each test in turn.
+    global _PENDING_PDFS
+    _PENDING_PDFS = []
+    try:
+        run_test_scalar_identity()
+        run_test_scalar_associativity()
+        run_test_complex_inverse()
+        run_test_additive_inverse()
+        run_test_zero_scalar_mul()  # NEW
+        run_test_inverse_of_inverse() # NEW
+    finally:
+        jobs, _PENDING_PDFS = _PENDING_PDFS, None
+        if jobs:
+            write_and_compile_many(jobs)
 
 
 if __name__ == "__main__":